@@ -1,6 +1,7 @@
 
 from .linkedinpy import LinkedinPy
 from .linkedinpy import smart_run
+from .async_linkedinpy import AsyncLinkedinPy
 from .settings import Settings
 
 # __variables__ with double-quoted values will be available in setup.py
@@ -0,0 +1,132 @@
+""" Awaitable front of a LinkedinPy session, so one event loop can drive
+many browsers of an account at once
+
+```python
+async def main():
+    session = await AsyncLinkedinPy.create(headless_browser=True)
+    async with session:
+        workers = [await session.spawn_worker() for i in range(3)]
+        await asyncio.gather(*[
+            worker.run_campaign("search_and_connect", query=query,
+                                connection_relationship_code="%5B%22S%22%5D",
+                                city_code="%5B%22in%3A6508%22%5D")
+            for worker, query in zip(workers, ["founder", "cto", "vc"])])
+        for worker in workers:
+            await worker.close()
+
+asyncio.get_event_loop().run_until_complete(main())
+```
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from socialcommons.browser import close_browser
+
+from .linkedinpy import LinkedinPy
+from .orchestrator import run_campaign
+from .search_util import click_search_result_action
+from .util import web_address_navigator
+from .util import scroll_until_loaded
+from .util import flush_activity
+from .database_engine import close_connections
+from .settings import Settings
+
+
+class AsyncLinkedinPy:
+    """ Runs every call of a LinkedinPy session on the session's own
+    thread, as WebDriver can't be driven by two threads at once, and lets
+    the event loop await it.
+
+    `Settings` is global to the process, so all the sessions of a process
+    must be of the same account: the session itself and its workers """
+    def __init__(self, session, executor, parent=None):
+        self.session = session
+        self.executor = executor
+        self.parent = parent
+
+    @classmethod
+    async def create(cls, **kwargs):
+        """ Start a LinkedinPy session with the given arguments """
+        executor = ThreadPoolExecutor(max_workers=1)
+        session = await asyncio.get_event_loop().run_in_executor(
+            executor, partial(LinkedinPy, **kwargs))
+
+        return cls(session, executor)
+
+    def call(self, function, *args, **kwargs):
+        """ Run the blocking function on the thread of the session """
+        return asyncio.get_event_loop().run_in_executor(
+            self.executor, partial(function, *args, **kwargs))
+
+    async def login(self):
+        return await self.call(self.session.login)
+
+    async def navigate(self, url):
+        return await self.call(web_address_navigator, Settings,
+                               self.session.browser, url)
+
+    async def scroll_until_loaded(self, item_css):
+        return await self.call(scroll_until_loaded, self.session.browser,
+                               item_css)
+
+    async def execute_script(self, script, *args):
+        return await self.call(self.session.browser.execute_script, script,
+                               *args)
+
+    async def page_source(self):
+        return await self.call(lambda: self.session.browser.page_source)
+
+    async def read_search_result_cards(self):
+        return await self.call(self.session.read_search_result_cards)
+
+    async def read_sent_invitation_cards(self):
+        return await self.call(self.session.read_sent_invitation_cards)
+
+    async def click_search_result_action(self, index, label):
+        return await self.call(click_search_result_action,
+                               self.session.browser, index, label)
+
+    async def run_campaign(self, action, **kwargs):
+        """ Run a session method of `orchestrator.CAMPAIGN_ACTIONS`, e.g.
+        `search_and_connect`, with its keyword arguments """
+        return await self.call(run_campaign, self.session,
+                               {"action": action, "kwargs": kwargs})
+
+    async def spawn_worker(self):
+        """ Get a session of the same account driving its own headless
+        browser, logged in with the cookies of this session """
+        cookies = await self.call(self.session.browser.get_cookies)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        worker = await asyncio.get_event_loop().run_in_executor(
+            executor, self.session.spawn_worker, cookies)
+
+        return AsyncLinkedinPy(worker, executor, self)
+
+    async def close(self):
+        """ Close the browser of a worker, leaving the session it was
+        spawned from running, with what the worker did in its counters """
+        def close_worker():
+            close_browser(self.session.browser, True, self.session.logger)
+            close_connections()
+            flush_activity(Settings)
+
+        await self.call(close_worker)
+        self.executor.shutdown(wait=False)
+
+        if self.parent:
+            await self.parent.call(self.parent.session.add_worker_counters,
+                                   self.session)
+
+    async def end(self):
+        """ End the session, like `LinkedinPy.end` """
+        await self.call(self.session.end)
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        await self.login()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.end()
@@ -0,0 +1,273 @@
+""" Daemon which keeps a logged in browser warm and runs the campaign jobs
+submitted to its queue folder, `{logfolder}jobs/`
+
+```
+python -m linkedinpy.daemon serve -u abc@example.com -p 123 --headless-browser
+python -m linkedinpy.daemon submit -u abc@example.com search_and_connect --kwargs '{"query": "founder"}'
+python -m linkedinpy.daemon stop -u abc@example.com
+```
+
+A job is a JSON file moving from `pending/` to `running/` and then to
+`done/` or `failed/`, where it gets its error and the stats it added.
+"""
+import json
+import os
+import signal
+import sys
+import time
+import uuid
+from argparse import ArgumentParser
+
+from selenium.common.exceptions import WebDriverException
+from socialcommons.file_manager import set_workspace
+from socialcommons.file_manager import get_logfolder
+from socialcommons.exceptions import SocialPyError
+
+from .linkedinpy import LinkedinPy
+from .login_util import FEED_URL
+from .login_util import is_logged_in
+from .orchestrator import CAMPAIGN_ACTIONS
+from .orchestrator import run_campaign
+from .orchestrator import acquire_lock
+from .settings import Settings
+from .util import update_activity
+from .util import forget_navigation
+from .util import flush_activity
+
+# folders of the queue, in the order a job moves through them
+JOB_STATES = ["pending", "running", "done", "failed"]
+
+# seconds between two looks into an empty queue
+POLL_INTERVAL = 5
+
+
+def get_queue_folder(logfolder):
+    """ Get the queue folder in the log folder of a user, making its state
+    folders on the first use """
+    queue_folder = "{}jobs{}".format(logfolder, os.sep)
+    for state in JOB_STATES:
+        path = os.path.join(queue_folder, state)
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+    return queue_folder
+
+
+def submit_job(queue_folder, action, kwargs=None):
+    """ Put a job running the given session method in the queue and return
+    its id, `stop` makes the daemon leave after the jobs before it """
+    if action != "stop" and action not in CAMPAIGN_ACTIONS:
+        raise ValueError("'{}' can't be run as a job".format(action))
+
+    submitted = time.time()
+    # the ids sort in the order of submission
+    job = {"id": "{}.{:06d}-{}".format(
+               time.strftime("%Y%m%d-%H%M%S", time.localtime(submitted)),
+               int(submitted % 1 * 1000000), uuid.uuid4().hex[:8]),
+           "action": action,
+           "kwargs": kwargs or {},
+           "submitted": submitted}
+    write_job(queue_folder, job, "pending")
+
+    return job["id"]
+
+
+def write_job(queue_folder, job, state):
+    """ Write the job into the folder of the given state at once, so the
+    daemon never reads it half written """
+    filename = os.path.join(queue_folder, state, "{}.json".format(job["id"]))
+    with open(filename + ".tmp", 'w') as jobFile:
+        json.dump(job, jobFile, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+class LinkedinPyDaemon:
+    """ Runs the queued jobs one by one on a single long-lived session, so
+    the browser starts and logs in once rather than once per job """
+    def __init__(self, session, poll_interval=POLL_INTERVAL):
+        self.session = session
+        self.logger = session.logger
+        self.queue_folder = get_queue_folder(session.logfolder)
+        self.poll_interval = poll_interval
+
+    def serve(self):
+        """ Run the jobs as they come until a `stop` job """
+        lockFile = acquire_lock(os.path.join(self.queue_folder, "daemon.lock"))
+        if lockFile is None:
+            raise SocialPyError("A daemon is already serving '{}'"
+                                .format(self.session.username))
+
+        with lockFile:
+            self.fail_interrupted_jobs()
+            self.session.login()
+            self.logger.info("Waiting for jobs in {}".format(self.queue_folder))
+
+            while True:
+                job = self.next_job()
+                if job is None:
+                    time.sleep(self.poll_interval)
+                    continue
+
+                if job.get("action") == "stop":
+                    self.finish_job(job, "done")
+                    self.logger.info("Stopping as job {} asked"
+                                     .format(job["id"]))
+                    break
+
+                self.run_job(job)
+
+    def next_job(self):
+        """ Take the oldest pending job, moving it to `running/` """
+        pending_folder = os.path.join(self.queue_folder, "pending")
+        for name in sorted(os.listdir(pending_folder)):
+            if not name.endswith(".json"):
+                continue
+
+            running_file = os.path.join(self.queue_folder, "running", name)
+            try:
+                os.replace(os.path.join(pending_folder, name), running_file)
+                with open(running_file) as jobFile:
+                    return json.load(jobFile)
+
+            except (OSError, IOError, ValueError) as exc:
+                self.logger.warning(
+                    "Dap! Error occurred while taking job {}:\n\t{}"
+                    .format(name, str(exc).encode("utf-8")))
+
+        return None
+
+    def run_job(self, job):
+        """ Run the job on the warm session and file its outcome """
+        self.logger.info("Running job {}: {}".format(job["id"], job["action"]))
+        before = self.session.get_live_stats()
+
+        try:
+            self.ensure_logged_in()
+            run_campaign(self.session, job)
+            job["error"] = None
+
+        except Exception as exc:
+            job["error"] = str(exc) or exc.__class__.__name__
+            self.logger.error(
+                "Pow! Error occurred while running job {}:\n\t{}"
+                .format(job["id"], str(exc).encode("utf-8")))
+
+        finally:
+            # a job is the unit of work, never leave its activity buffered
+            flush_activity(Settings)
+
+        after = self.session.get_live_stats()
+        job["stats"] = {stat: after[stat] - before[stat] for stat in after}
+        self.finish_job(job, "failed" if job["error"] else "done")
+
+    def finish_job(self, job, state):
+        job["finished"] = time.time()
+        write_job(self.queue_folder, job, state)
+        os.remove(os.path.join(self.queue_folder, "running",
+                               "{}.json".format(job["id"])))
+
+    def fail_interrupted_jobs(self):
+        """ File the jobs a previous daemon left running as failed rather
+        than run their half done work again """
+        running_folder = os.path.join(self.queue_folder, "running")
+        for name in os.listdir(running_folder):
+            if not name.endswith(".json"):
+                continue
+
+            with open(os.path.join(running_folder, name)) as jobFile:
+                job = json.load(jobFile)
+            job["error"] = "Interrupted by the daemon stopping"
+            self.finish_job(job, "failed")
+
+    def ensure_logged_in(self):
+        """ Make sure the warm session is still logged in before a job,
+        replacing a crashed browser and logging in again when needed """
+        try:
+            # request the feed for real, a browser still showing it would
+            # let the navigator skip the request a logout only shows up on
+            self.session.browser.get(FEED_URL)
+            update_activity(Settings)
+            forget_navigation(self.session.browser)
+            if is_logged_in(self.session.browser):
+                return
+
+            self.logger.info("The session has logged out, logging in again...")
+
+        except WebDriverException as exc:
+            self.logger.warning(
+                "Wah! The browser stopped responding, starting a new one:"
+                "\n\t{}".format(str(exc).encode("utf-8")))
+            try:
+                self.session.browser.quit()
+            except WebDriverException:
+                pass
+            self.session.browser = self.session.create_browser(
+                self.session.headless_browser)
+
+        self.session.login()
+        if not is_logged_in(self.session.browser):
+            raise SocialPyError("Couldn't log '{}' in again"
+                                .format(self.session.username))
+
+
+def main():
+    """ Serve the jobs of a user, or submit them, from the command line """
+    parser = ArgumentParser(
+        prog="linkedinpy.daemon",
+        description="Keep a LinkedinPy session warm and run the jobs "
+                    "submitted to it")
+    parser.add_argument(
+        "--workspace", default=None,
+        help="Workspace folder, your home folder by default")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser(
+        "serve", help="Log in and run the jobs as they come")
+    serve.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+
+    submit = commands.add_parser("submit", help="Put a job in the queue")
+    submit.add_argument("action", choices=CAMPAIGN_ACTIONS,
+                        help="Session method the job runs")
+    submit.add_argument("--kwargs", type=json.loads, default={},
+                        help="Keyword arguments of the job as JSON")
+
+    commands.add_parser(
+        "stop", help="Stop the daemon after the jobs already queued")
+
+    for command in commands.choices.values():
+        command.add_argument("-u", "--username", required=True)
+
+    # `serve` leaves the other flags, e.g. `--headless-browser`, to the
+    # session
+    args, args_unknown = parser.parse_known_args()
+    if args.command is None:
+        parser.error("the command is required")
+    if args.command != "serve" and args_unknown:
+        parser.error("unrecognized arguments: {}"
+                     .format(" ".join(args_unknown)))
+
+    set_workspace(Settings, path=args.workspace)
+
+    if args.command != "serve":
+        queue_folder = get_queue_folder(
+            get_logfolder(args.username, True, Settings))
+        if args.command == "submit":
+            print(submit_job(queue_folder, args.action, args.kwargs))
+        else:
+            print(submit_job(queue_folder, "stop"))
+        return
+
+    # leave through `session.end` on `kill` as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    session = LinkedinPy(username=args.username)
+    try:
+        LinkedinPyDaemon(session, args.poll_interval).serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session.end()
+
+
+if __name__ == "__main__":
+    main()
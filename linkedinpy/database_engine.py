@@ -1,7 +1,33 @@
 import os
+import random
+import re
 import sqlite3
+import threading
+import time
 
 # from .settings import Settings
+
+# size of the per-connection cache of compiled (prepared) statements
+STATEMENT_CACHE_SIZE = 128
+
+# seconds a connection waits for the other processes' write locks
+BUSY_TIMEOUT = 30
+
+# times a write still failing on a locked DB is retried, with a backoff
+# starting at `WRITE_RETRY_DELAY` seconds
+WRITE_RETRIES = 5
+WRITE_RETRY_DELAY = 0.5
+
+# `INSERT ... ON CONFLICT DO UPDATE` (upsert) needs SQLite 3.24 or newer,
+# older ones write with an `UPDATE` and an `INSERT OR IGNORE` instead
+SQLITE_HAS_UPSERT = sqlite3.sqlite_version_info >= (3, 24, 0)
+
+# long-lived connections, one per database file for every thread
+connection_pool = threading.local()
+
+# the last address and profile id `get_database` resolved, with their key
+resolved_database = {}
+
 SELECT_FROM_PROFILE_WHERE_NAME = "SELECT * FROM profiles WHERE name = :name"
 
 INSERT_INTO_PROFILE = "INSERT INTO profiles (name) VALUES (?)"
@@ -18,12 +44,24 @@ SQL_CREATE_RECORD_ACTIVITY_TABLE = """
         `server_calls` INT UNSIGNED NOT NULL,
         `created` DATETIME NOT NULL);"""
 
+SQL_CREATE_RECORD_ACTIVITY_INDEX = """
+    CREATE INDEX IF NOT EXISTS `idx_recordActivity_profile_bucket`
+        ON `recordActivity` (`profile_id`, `hour_bucket`);"""
+
 SQL_CREATE_CONNECT_RESTRICTION_TABLE = """
     CREATE TABLE IF NOT EXISTS `connectRestriction` (
         `profile_id` INTEGER REFERENCES `profiles` (id),
         `username` TEXT NOT NULL,
         `times` TINYINT UNSIGNED NOT NULL);"""
 
+SQL_CREATE_CONNECT_RESTRICTION_INDEX = """
+    CREATE UNIQUE INDEX IF NOT EXISTS `idx_connectRestriction_profile_username`
+        ON `connectRestriction` (`profile_id`, `username`);"""
+
+SQL_CREATE_CONNECT_RESTRICTION_MODIFIED_INDEX = """
+    CREATE INDEX IF NOT EXISTS `idx_connectRestriction_profile_modified`
+        ON `connectRestriction` (`profile_id`, `modified`);"""
+
 SQL_CREATE_ACCOUNTS_PROGRESS_TABLE = """
     CREATE TABLE IF NOT EXISTS `accountsProgress` (
         `profile_id` INTEGER NOT NULL,
@@ -33,8 +71,66 @@ SQL_CREATE_ACCOUNTS_PROGRESS_TABLE = """
         CONSTRAINT `fk_accountsProgress_profiles1`
         FOREIGN KEY(`profile_id`) REFERENCES `profiles`(`id`));"""
 
+SQL_CREATE_SEARCH_INDEX_TABLE = """
+    CREATE TABLE IF NOT EXISTS `searchIndex` (
+        `profile_id` INTEGER REFERENCES `profiles` (id),
+        `search_url` TEXT NOT NULL,
+        `total` INTEGER,
+        `pages` INTEGER NOT NULL,
+        `modified` INTEGER NOT NULL);"""
+
+SQL_CREATE_SEARCH_INDEX_INDEX = """
+    CREATE UNIQUE INDEX IF NOT EXISTS `idx_searchIndex_profile_url`
+        ON `searchIndex` (`profile_id`, `search_url`);"""
+
+SQL_CREATE_SEARCH_RESULTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS `searchResults` (
+        `profile_id` INTEGER REFERENCES `profiles` (id),
+        `search_url` TEXT NOT NULL,
+        `page` SMALLINT UNSIGNED NOT NULL,
+        `cards` TEXT NOT NULL,
+        `modified` INTEGER NOT NULL);"""
+
+SQL_CREATE_SEARCH_RESULTS_INDEX = """
+    CREATE UNIQUE INDEX IF NOT EXISTS `idx_searchResults_profile_url_page`
+        ON `searchResults` (`profile_id`, `search_url`, `page`);"""
+
+
+# schema upgrades applied in order, each one bumps `PRAGMA user_version`
+SQL_MIGRATIONS = [
+    # 1: one `connectRestriction` row per profile and username
+    ["ALTER TABLE `connectRestriction` RENAME TO `connectRestriction_old`",
+     SQL_CREATE_CONNECT_RESTRICTION_TABLE,
+     "INSERT INTO `connectRestriction` (profile_id, username, times) "
+     "SELECT profile_id, username, MAX(times) FROM `connectRestriction_old` "
+     "GROUP BY profile_id, username",
+     "DROP TABLE `connectRestriction_old`",
+     SQL_CREATE_CONNECT_RESTRICTION_INDEX],
+    # 2: `recordActivity` rows addressed by their local epoch hour, which is
+    # the local `created` time read as if it was UTC
+    ["ALTER TABLE `recordActivity` ADD COLUMN `hour_bucket` INTEGER",
+     "UPDATE `recordActivity` SET "
+     "hour_bucket = CAST(STRFTIME('%s', created) AS INTEGER) / 3600",
+     SQL_CREATE_RECORD_ACTIVITY_INDEX],
+    # 3: change time of `connectRestriction` rows for incremental exports
+    ["ALTER TABLE `connectRestriction` "
+     "ADD COLUMN `modified` INTEGER NOT NULL DEFAULT 0",
+     SQL_CREATE_CONNECT_RESTRICTION_MODIFIED_INDEX],
+    # 4: result and page counts of the searches, by their normalized URL
+    [SQL_CREATE_SEARCH_INDEX_TABLE,
+     SQL_CREATE_SEARCH_INDEX_INDEX],
+    # 5: result cards of the search pages lately read
+    [SQL_CREATE_SEARCH_RESULTS_TABLE,
+     SQL_CREATE_SEARCH_RESULTS_INDEX],
+]
+
 
 def get_database(Settings, make=False):
+    # reuse the last resolution unless the location or the profile changed
+    resolved_key, address, id = resolved_database.get("last", (None,) * 3)
+    if not make and resolved_key == get_database_key(Settings):
+        return address, id
+
     address = Settings.database_location
     logger = Settings.logger
     credentials = Settings.profile
@@ -47,14 +143,93 @@ def get_database(Settings, make=False):
 
     id = get_profile(Settings, name, address, logger) if id is None or make else id
 
+    resolved_database["last"] = (get_database_key(Settings), address, id)
+
     return address, id
 
 
+def get_database_key(Settings):
+    """ Get the settings which the DB address and profile id depend on """
+    return (Settings.database_location,
+            Settings.split_db,
+            Settings.profile["name"],
+            Settings.profile["id"])
+
+
+def get_connection(address):
+    """ Get the long-lived connection of the current thread to the DB at the
+    given address, opening it on the first use """
+    connections = getattr(connection_pool, "connections", None)
+    if connections is None:
+        connections = connection_pool.connections = {}
+
+    connection = connections.get(address)
+    if connection is None:
+        connection = sqlite3.connect(address,
+                                     timeout=BUSY_TIMEOUT,
+                                     cached_statements=STATEMENT_CACHE_SIZE)
+        connection.row_factory = sqlite3.Row
+        # with WAL a `NORMAL` sync is still safe against corruption
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connections[address] = connection
+
+    return connection
+
+
+def write_with_retry(address, operation):
+    """ Run `operation(connection)` in a transaction on the DB at the given
+    address and retry it while other processes keep the DB locked """
+    connection = get_connection(address)
+
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            with connection:
+                return operation(connection)
+
+        except sqlite3.OperationalError as exc:
+            locked = ("locked" in str(exc) or "busy" in str(exc))
+            if not locked or attempt == WRITE_RETRIES:
+                raise
+
+            time.sleep(random.uniform(0, WRITE_RETRY_DELAY * 2 ** attempt))
+
+
+def upsert_rows(connection, statements, rows):
+    """ Insert or update the rows, given as dictionaries of the named
+    parameters, with the (upsert, update, insert or ignore) statements """
+    upsert, update, insert = statements
+
+    if SQLITE_HAS_UPSERT:
+        connection.executemany(upsert, rows)
+
+    else:
+        # update the rows which exist, then insert the others
+        connection.executemany(update, rows)
+        connection.executemany(insert, rows)
+
+
+def close_connections():
+    """ Close all the DB connections opened by the current thread """
+    connections = getattr(connection_pool, "connections", None) or {}
+
+    while connections:
+        address, connection = connections.popitem()
+        connection.close()
+
+
 def create_database(address, logger, name):
     try:
-        connection = sqlite3.connect(address)
+        if not SQLITE_HAS_UPSERT:
+            logger.warning(
+                "SQLite {} has no upserts, writing with an update and an "
+                "insert instead (3.24 or newer is faster)"
+                .format(sqlite3.sqlite_version))
+
+        connection = get_connection(address)
+        # let several processes read and write the DB at the same time
+        connection.execute("PRAGMA journal_mode = WAL")
+
         with connection:
-            connection.row_factory = sqlite3.Row
             cursor = connection.cursor()
 
             create_tables(cursor, ["profiles",
@@ -62,18 +237,13 @@ def create_database(address, logger, name):
                                    "connectRestriction",
                                    "accountsProgress"])
 
-            connection.commit()
+            migrate_database(cursor, logger)
 
     except Exception as exc:
         logger.warning(
             "Wah! Error occurred while getting a DB for '{}':\n\t{}"
             .format(name, str(exc).encode("utf-8")))
 
-    finally:
-        if connection:
-            # close the open connection
-            connection.close()
-
 
 def create_tables(cursor, tables):
     if "profiles" in tables:
@@ -89,6 +259,30 @@ def create_tables(cursor, tables):
         cursor.execute(SQL_CREATE_ACCOUNTS_PROGRESS_TABLE)
 
 
+def migrate_database(cursor, logger):
+    """ Upgrade the DB schema by applying the pending migrations in a
+    single transaction """
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(SQL_MIGRATIONS):
+        return
+
+    # take the write lock before reading the version for good, so processes
+    # starting on an old DB at the same time migrate it only once
+    cursor.execute("BEGIN IMMEDIATE")
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(SQL_MIGRATIONS):
+        return
+
+    logger.info("Upgrading the DB schema from version {} to {}"
+                .format(version, len(SQL_MIGRATIONS)))
+
+    for statements in SQL_MIGRATIONS[version:]:
+        for statement in statements:
+            cursor.execute(statement)
+
+    cursor.execute("PRAGMA user_version = {}".format(len(SQL_MIGRATIONS)))
+
+
 def verify_database_directories(address):
     db_dir = os.path.dirname(address)
     if not os.path.exists(db_dir):
@@ -102,15 +296,25 @@ def validate_database_address(Settings):
         address = address if address.endswith(slash) else address + slash
         address += "linkedinpy.db"
         Settings.database_location = address
+    if Settings.split_db:
+        address = get_shard_address(address, Settings.profile["name"])
     verify_database_directories(address)
     return address
 
 
+def get_shard_address(address, name):
+    """ Get the address of the DB shard holding only the given profile,
+    e.g. `linkedinpy_{username}.db` next to `linkedinpy.db` """
+    base, extension = os.path.splitext(address)
+    name = re.sub(r"[^\w.@-]", "_", name)
+
+    return "{}_{}{}".format(base, name, extension)
+
+
 def get_profile(Settings, name, address, logger):
     try:
-        conn = sqlite3.connect(address)
+        conn = get_connection(address)
         with conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
             profile = select_profile_by_username(cursor, name)
@@ -123,10 +327,6 @@ def get_profile(Settings, name, address, logger):
         logger.warning(
             "Heeh! Error occurred while getting a DB profile for '{}':\n\t{}"
             .format(name, str(exc).encode("utf-8")))
-    finally:
-        if conn:
-            # close the open connection
-            conn.close()
 
     profile = dict(profile)
     id = profile["id"]
@@ -0,0 +1,181 @@
+""" Tool to split a combined DB into per-profile shards and merge them back
+
+```
+python -m linkedinpy.database_shards split ~/LinkedinPy/db/linkedinpy.db
+python -m linkedinpy.database_shards merge ~/LinkedinPy/db/linkedinpy.db
+```
+"""
+import glob
+import logging
+import os
+import sqlite3
+from argparse import ArgumentParser
+from contextlib import closing
+
+from .database_engine import create_database
+from .database_engine import get_shard_address
+from .database_engine import close_connections
+
+
+def split_database(address, logger):
+    """ Copy every profile of the combined DB into its own shard next to it
+    and return the addresses of the shards """
+    create_database(address, logger, "all profiles")
+
+    with closing(sqlite3.connect(address)) as source:
+        profiles = source.execute("SELECT id, name FROM profiles").fetchall()
+
+    shards = []
+    for id, name in profiles:
+        shard = get_shard_address(address, name)
+        create_database(shard, logger, name)
+        copy_profiles(address, shard, id)
+
+        logger.info("Split '{}' profile into {}".format(name, shard))
+        shards.append(shard)
+
+    close_connections()
+    return shards
+
+
+def merge_databases(address, shards, logger):
+    """ Copy the profiles of all the given shards into the combined DB """
+    create_database(address, logger, "all profiles")
+
+    for shard in shards:
+        create_database(shard, logger, shard)
+        copy_profiles(shard, address)
+
+        logger.info("Merged {} into {}".format(shard, address))
+
+    close_connections()
+
+
+def copy_profiles(source, target, id=None):
+    """ Copy the profile with the given id (or all profiles) and its rows
+    from the source DB to the target DB, matching the profiles by name """
+    with closing(sqlite3.connect(target)) as conn:
+        conn.execute("ATTACH DATABASE ? AS source", (source,))
+
+        with conn:
+            cur = conn.cursor()
+            profiles = cur.execute(
+                "SELECT id, name FROM source.profiles WHERE "
+                ":id IS NULL OR id = :id", {"id": id}).fetchall()
+
+            for source_id, name in profiles:
+                target_id = copy_profile(cur, source_id, name)
+                copy_profile_rows(cur, source_id, target_id)
+
+        conn.execute("DETACH DATABASE source")
+
+
+def copy_profile(cur, source_id, name):
+    """ Get the id of the profile in the target DB, adding it if missing """
+    profile = cur.execute("SELECT id FROM main.profiles WHERE name = ?",
+                          (name,)).fetchone()
+    if profile:
+        return profile[0]
+
+    # keep the id of the source if it's still free in the target DB
+    taken = cur.execute("SELECT 1 FROM main.profiles WHERE id = ?",
+                        (source_id,)).fetchone()
+    cur.execute("INSERT INTO main.profiles (id, name) VALUES (?, ?)",
+                (None if taken else source_id, name))
+
+    return cur.lastrowid
+
+
+def copy_profile_rows(cur, source_id, target_id):
+    """ Copy the activity, connect, progress and search rows of a profile,
+    without duplicating rows the target DB already has """
+    # an update and an insert rather than an upsert, which needs SQLite 3.24
+    cur.execute(
+        "UPDATE main.connectRestriction SET "
+        "times = MAX(times, (SELECT times FROM source.connectRestriction AS "
+        "restriction WHERE {0})), "
+        "modified = MAX(modified, (SELECT modified FROM "
+        "source.connectRestriction AS restriction WHERE {0})) "
+        "WHERE profile_id = :target_id AND EXISTS (SELECT 1 FROM "
+        "source.connectRestriction AS restriction WHERE {0})".format(
+            "restriction.profile_id = :source_id AND restriction.username = "
+            "main.connectRestriction.username"),
+        {"source_id": source_id, "target_id": target_id})
+
+    cur.execute(
+        "INSERT OR IGNORE INTO main.connectRestriction (profile_id, username, "
+        "times, modified) SELECT ?, username, times, modified "
+        "FROM source.connectRestriction WHERE profile_id = ?",
+        (target_id, source_id))
+
+    cur.execute(
+        "INSERT INTO main.recordActivity (profile_id, connections, "
+        "server_calls, created, hour_bucket) "
+        "SELECT ?, connections, server_calls, created, hour_bucket "
+        "FROM source.recordActivity AS activity WHERE profile_id = ? "
+        "AND NOT EXISTS (SELECT 1 FROM main.recordActivity WHERE "
+        "profile_id = ? AND hour_bucket = activity.hour_bucket)",
+        (target_id, source_id, target_id))
+
+    cur.execute(
+        "INSERT INTO main.accountsProgress (profile_id, connections, "
+        "created, modified) "
+        "SELECT ?, connections, created, modified "
+        "FROM source.accountsProgress AS progress WHERE profile_id = ? "
+        "AND NOT EXISTS (SELECT 1 FROM main.accountsProgress WHERE "
+        "profile_id = ? AND created = progress.created)",
+        (target_id, source_id, target_id))
+
+    copy_newer_rows(cur, "searchIndex", ["search_url"],
+                    ["total", "pages"], source_id, target_id)
+    copy_newer_rows(cur, "searchResults", ["search_url", "page"],
+                    ["cards"], source_id, target_id)
+
+
+def copy_newer_rows(cur, table, keys, columns, source_id, target_id):
+    """ Copy the rows of a profile from a table with a unique `profile_id` +
+    `keys` index, keeping the last `modified` of the rows both DBs have """
+    matching = " AND ".join("newer.{0} = main.{1}.{0}".format(key, table)
+                            for key in keys)
+    cur.execute(
+        "DELETE FROM main.{0} WHERE profile_id = ? AND EXISTS ("
+        "SELECT 1 FROM source.{0} AS newer WHERE newer.profile_id = ? "
+        "AND {1} AND newer.modified > main.{0}.modified)"
+        .format(table, matching),
+        (target_id, source_id))
+
+    copied = ", ".join(keys + columns + ["modified"])
+    cur.execute(
+        "INSERT OR IGNORE INTO main.{0} (profile_id, {1}) "
+        "SELECT ?, {1} FROM source.{0} WHERE profile_id = ?"
+        .format(table, copied),
+        (target_id, source_id))
+
+
+def main():
+    """ Split or merge DB shards from the command line """
+    parser = ArgumentParser(
+        prog="linkedinpy.database_shards",
+        description="Split a LinkedinPy DB into per-username shards "
+                    "or merge the shards back into one DB")
+    parser.add_argument("command", choices=["split", "merge"])
+    parser.add_argument("database", help="Combined DB, e.g. linkedinpy.db")
+    parser.add_argument(
+        "shards", nargs="*",
+        help="Shards to merge, all `linkedinpy_*.db` next to it by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("linkedinpy.database_shards")
+
+    if args.command == "split":
+        split_database(args.database, logger)
+
+    else:
+        base, extension = os.path.splitext(args.database)
+        shards = args.shards or glob.glob("{}_*{}".format(base, extension))
+        merge_databases(args.database, shards, logger)
+
+
+if __name__ == "__main__":
+    main()
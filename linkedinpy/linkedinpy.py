@@ -6,8 +6,6 @@ import random
 from sys import platform
 from platform import python_version
 import os
-import json
-import sqlite3
 
 import pprint as pp
 
@@ -16,7 +14,10 @@ from selenium.webdriver.common.action_chains import ActionChains
 from pyvirtualdisplay import Display
 import logging
 from contextlib import contextmanager
+from copy import copy
 from copy import deepcopy
+import queue
+import threading
 from sys import exit as clean_exit
 from tempfile import gettempdir
 
@@ -25,14 +26,21 @@ from .login_util import login_user
 from socialcommons.time_util import sleep
 
 from .util import update_activity
+from .util import flush_activity
 from .util import web_address_navigator
 from .util import interruption_handler
 from .util import highlight_print
 from .util import truncate_float
+from .util import format_run_time
 from .util import save_account_progress
 from .util import parse_cli_args
+from .util import scroll_until_loaded
+from .util import explicit_wait
+from .util import add_cookies
+from .util import forget_navigation
 
 from .database_engine import get_database
+from .database_engine import close_connections
 from socialcommons.browser import set_selenium_local_session
 from socialcommons.browser import close_browser
 from socialcommons.file_manager import get_workspace
@@ -40,13 +48,49 @@ from socialcommons.file_manager import get_logfolder
 
 from socialcommons.quota_supervisor import quota_supervisor
 
+from .search_util import SEARCH_RESULT_CARD_CSS
+from .search_util import get_search_result_cards
+from .search_util import get_sent_invitation_cards
+from .search_util import get_search_result_counts
+from .search_util import click_search_result_action
+
+from .page_parser import parse_search_result_cards
+from .page_parser import parse_sent_invitation_cards
+from .page_parser import parse_search_result_counts
+
+from .search_index_util import get_search_index
+from .search_index_util import update_search_index
+from .search_index_util import get_cached_search_results
+from .search_index_util import cache_search_results
+
 from .unconnect_util import connect_restriction
+from .unconnect_util import load_connected_pool
+from .unconnect_util import claim_connect
+from .unconnect_util import write_connect_restrictions
+from .unconnect_util import export_connect_restriction
+
+from .network_policy import NetworkPolicy
+from .selector_registry import selector_registry
+from .prefetch_util import PagePrefetcher
 
 # import exceptions
 from selenium.common.exceptions import NoSuchElementException
 from socialcommons.exceptions import SocialPyError
 from .settings import Settings
 
+# methods which `run_parallel_jobs` can run on worker browsers
+PARALLEL_JOBS = ["search_and_connect", "search_and_endorse"]
+
+# sessional counters of the live report, which workers count on their own
+SESSION_COUNTERS = ["liked_img", "already_liked", "liked_comments",
+                    "commented", "replied_to_comments", "connected",
+                    "already_connected", "unconnected", "inap_img",
+                    "not_valid_users"]
+
+# either of the popups LinkedIn shows after clicking 'Connect'
+CONNECT_POPUP_CSS = ("div.modal-wormhole-content > div, "
+                     "#artdeco-modal-outlet div.artdeco-modal")
+
 class LinkedinPy:
     """Class to be instantiated to use the script"""
     def __init__(self,
@@ -66,7 +110,11 @@ class LinkedinPy:
                  disable_image_load=False,
                  bypass_suspicious_attempt=False,
                  bypass_with_mobile=False,
-                 multi_logs=True):
+                 multi_logs=True,
+                 split_db=False,
+                 block_resources=None,
+                 block_url_patterns=None,
+                 offline_parsing=False):
 
         cli_args = parse_cli_args()
         username = cli_args.username or username
@@ -80,6 +128,9 @@ class LinkedinPy:
         bypass_suspicious_attempt = (
             cli_args.bypass_suspicious_attempt or bypass_suspicious_attempt)
         bypass_with_mobile = cli_args.bypass_with_mobile or bypass_with_mobile
+        split_db = cli_args.split_db or split_db
+        block_resources = cli_args.block_resources or block_resources
+        offline_parsing = cli_args.offline_parsing or offline_parsing
         if not get_workspace(Settings):
             raise SocialPyError(
                 "Oh no! I don't have a workspace to work at :'(")
@@ -99,11 +150,26 @@ class LinkedinPy:
         self.bypass_with_mobile = bypass_with_mobile
         self.disable_image_load = disable_image_load
 
+        # `block_resources` is True for all the categories or a list of them
+        if block_resources or block_url_patterns:
+            self.network_policy = NetworkPolicy(
+                None if block_resources is True else block_resources or [],
+                block_url_patterns)
+        else:
+            self.network_policy = None
+        Settings.network_policy = self.network_policy
+
+        # read the cards of a page from one `page_source` snapshot rather
+        # than from the live page
+        self.offline_parsing = offline_parsing
+
         self.username = username or os.environ.get('LINKEDIN_USER')
         self.password = password or os.environ.get('LINKEDIN_PW')
         Settings.profile["name"] = self.username
+        Settings.split_db = split_db
 
         self.page_delay = page_delay
+        Settings.page_delay = page_delay
         self.switch_language = True
         self.use_firefox = use_firefox
         Settings.use_firefox = self.use_firefox
@@ -131,6 +197,7 @@ class LinkedinPy:
         self.logger = self.get_linkedinpy_logger(self.show_logs)
 
         get_database(Settings, make=True)  # IMPORTANT: think twice before relocating
+        load_connected_pool(self.logger)
 
         if self.selenium_local_session is True:
             self.set_selenium_local_session(Settings)
@@ -171,11 +238,15 @@ class LinkedinPy:
             return logger
 
     def set_selenium_local_session(self, Settings):
-        self.browser, err_msg = \
+        self.browser = self.create_browser(self.headless_browser)
+
+    def create_browser(self, headless_browser):
+        """ Start a new browser with the options of this session """
+        browser, err_msg = \
             set_selenium_local_session(self.proxy_address,
                                        self.proxy_port,
                                        self.proxy_chrome_extension,
-                                       self.headless_browser,
+                                       headless_browser,
                                        self.use_firefox,
                                        self.browser_profile_path,
                                        # Replaces
@@ -189,6 +260,97 @@ class LinkedinPy:
         if len(err_msg) > 0:
             raise SocialPyError(err_msg)
 
+        # elements are waited for explicitly, with `explicit_wait` or the
+        # `timeout` of a selector lookup, so a missing one costs no wait
+        browser.implicitly_wait(0)
+
+        if self.network_policy:
+            self.network_policy.apply(browser, self.logger)
+
+        return browser
+
+    def spawn_worker(self, cookies):
+        """ Get a copy of this session driving its own headless browser,
+        logged in with the given cookies of this session """
+        worker = copy(self)
+        worker.browser = self.create_browser(True)
+        for counter in SESSION_COUNTERS:
+            setattr(worker, counter, 0)
+
+        # cookies can only be set on a page of their domain
+        web_address_navigator(Settings, worker.browser,
+                              "https://www.linkedin.com/")
+        add_cookies(worker.browser, cookies)
+
+        return worker
+
+    def add_worker_counters(self, worker):
+        """ Count what a worker of this session did in its counters """
+        for counter in SESSION_COUNTERS:
+            setattr(self, counter,
+                    getattr(self, counter) + getattr(worker, counter))
+
+    def run_parallel_jobs(self, jobs, workers=2):
+        """
+         Run independent search jobs at once on `workers` headless browser
+        sessions. The workers share the quota accounting and the connected
+        users DB of this session.
+
+        :param jobs: list of (method name, keyword arguments) pairs, e.g.
+            [("search_and_connect", {"query": "founder", ...}), ...]
+        :return: the results of the jobs, in the order of the jobs
+        """
+        for name, kwargs in jobs:
+            if name not in PARALLEL_JOBS:
+                raise SocialPyError(
+                    "'{}' can't be run as a parallel job".format(name))
+
+        # browsers are driven by one thread at a time, so read them here
+        cookies = self.browser.get_cookies()
+        pending = queue.Queue()
+        for index, job in enumerate(jobs):
+            pending.put((index, job))
+        results = [None] * len(jobs)
+        counters_lock = threading.Lock()
+
+        def work():
+            try:
+                worker = self.spawn_worker(cookies)
+            except Exception as exc:
+                self.logger.error("Couldn't start a worker browser:\n\t{}"
+                                  .format(str(exc).encode("utf-8")))
+                return
+
+            try:
+                while True:
+                    try:
+                        index, (name, kwargs) = pending.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    try:
+                        results[index] = getattr(worker, name)(**kwargs)
+                    except Exception as exc:
+                        self.logger.error("Parallel job '{}' failed:\n\t{}"
+                                          .format(name,
+                                                  str(exc).encode("utf-8")))
+            finally:
+                close_browser(worker.browser, True, self.logger)
+                close_connections()
+                with counters_lock:
+                    self.add_worker_counters(worker)
+
+        threads = [threading.Thread(target=work,
+                                    name="linkedinpy-worker-{}".format(i))
+                   for i in range(min(workers, len(jobs)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        flush_activity(Settings)
+        return results
+
     def login(self):
         """Used to login the user either with the username and password"""
         if not login_user(self.browser,
@@ -227,6 +389,27 @@ class LinkedinPy:
                     'Unable to save account progress, skipping data update')
         return self
 
+    def read_search_result_cards(self):
+        """ Read the result cards of the loaded search page """
+        if self.offline_parsing:
+            return parse_search_result_cards(self.browser.page_source)
+
+        return get_search_result_cards(self.browser)
+
+    def read_search_result_counts(self):
+        """ Read the result and page counts of the loaded search page """
+        if self.offline_parsing:
+            return parse_search_result_counts(self.browser.page_source)
+
+        return get_search_result_counts(self.browser)
+
+    def read_sent_invitation_cards(self):
+        """ Read the cards of the loaded sent invitations page """
+        if self.offline_parsing:
+            return parse_sent_invitation_cards(self.browser.page_source)
+
+        return get_sent_invitation_cards(self.browser)
+
     def withdraw_old_invitations(self,
             skip_pages=10,
             sleep_delay=6):
@@ -237,29 +420,20 @@ class LinkedinPy:
                 url = "https://www.linkedin.com/mynetwork/invitation-manager/sent/?page=" + str(page_no)
                 web_address_navigator(Settings,self.browser, url)
                 print("Starting page:", page_no)
-                if self.browser.current_url=="https://www.linkedin.com/mynetwork/invitation-manager/sent/" or len(self.browser.find_elements_by_css_selector("li.invitation-card div.pl5"))==0:
+                cards = self.read_sent_invitation_cards()
+                if self.browser.current_url=="https://www.linkedin.com/mynetwork/invitation-manager/sent/" or len(cards)==0:
                     print("============Last Page Reached==============")
                     break
                 checked_in_page = 0
-                for i in range(0, len(self.browser.find_elements_by_css_selector("li.invitation-card div.pl5"))):
+                for card in cards:
                     try:
-                        res_item = self.browser.find_elements_by_css_selector("li.invitation-card div.pl5")[i]
-                        try:
-                            link = res_item.find_element_by_css_selector("div > a")
-                            profile_link = link.get_attribute("href")
-                            user_name = profile_link.split('/')[4]
-                            self.logger.info("user_name : {}".format(user_name))
-                        except Exception as e:
-                            print("Might be a stale profile", e)
-                        time = res_item.find_element_by_css_selector("div > time")
-                        self.logger.info("time : {}".format(time.text))
-                        check_button = res_item.find_element_by_css_selector("div > div:nth-child(1) > input")
-                        check_status = check_button.get_attribute("data-artdeco-is-focused")
-                        self.logger.info("check_status : {}".format(check_status))
+                        self.logger.info("user_name : {}".format(card["username"]))
+                        self.logger.info("time : {}".format(card["time"]))
 
-                        self.browser.execute_script("window.scrollTo(0, " + str((i+1)*104) + ");")
-
-                        if "month" in time.text:
+                        if card["time"] and "month" in card["time"]:
+                            self.browser.execute_script("window.scrollTo(0, " + str((card["index"]+1)*104) + ");")
+                            res_item = selector_registry.find_elements(self.browser, "sent_invitation_card")[card["index"]]
+                            check_button = selector_registry.find_element(self.browser, "sent_invitation_checkbox", within=res_item)
                             (ActionChains(self.browser)
                              .move_to_element(check_button)
                              .click()
@@ -276,7 +450,7 @@ class LinkedinPy:
                     self.logger.info("Widraw to be pressed")
                     try:
                         self.browser.execute_script("window.scrollTo(0, 0);")
-                        withdraw_button = self.browser.find_element_by_css_selector("ul > li.mn-list-toolbar__right-button > button")
+                        withdraw_button = selector_registry.find_element(self.browser, "withdraw_button")
                         self.logger.info("withdraw_button : {}".format(withdraw_button.text))
                         if "Withdraw" in withdraw_button.text:
                             (ActionChains(self.browser)
@@ -327,38 +501,71 @@ class LinkedinPy:
                 web_address_navigator(Settings,self.browser, temp_search_url)
                 self.logger.info("Starting page: {}".format(page_no))
 
-                for jc in range(2, 11):
-                    sleep(1)
-                    self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight/" + str(jc) + ");")
+                scroll_until_loaded(self.browser, SEARCH_RESULT_CARD_CSS)
 
-                if len(self.browser.find_elements_by_css_selector("div.search-result__wrapper"))==0:
+                cards = self.read_search_result_cards()
+                if len(cards)==0:
                     self.logger.info("============Last Page Reached or asking for Premium membership==============")
                     break
-                for i in range(0, len(self.browser.find_elements_by_css_selector("div.search-result__wrapper"))):
-                    try:
-                        res_item = self.browser.find_elements_by_css_selector("li.search-result div.search-entity div.search-result__wrapper")[i]
-                        link = res_item.find_element_by_css_selector("div > a")
-                        profile_link = link.get_attribute("href")
-                        user_name = profile_link.split('/')[4]
-                        self.logger.info("user_name : {}".format(user_name))
-                        msg_button = res_item.find_element_by_xpath("//div[3]/div/div/button[text()='Message']")
-                        print(msg_button.text, "present")
-                        if msg_button.text=="Message":
-                            connect_restriction("write", user_name, None, self.logger)
-                            self.logger.info("saved {} to db".format(user_name))
-                    except Exception as e:
-                        self.logger.error(e)
+                first_connects = []
+                for card in cards:
+                    user_name = card["username"]
+                    self.logger.info("user_name : {}".format(user_name))
+                    if user_name and card["action"]=="Message":
+                        first_connects.append(user_name)
+                write_connect_restrictions(first_connects, self.logger)
+                self.logger.info("saved {} users to db".format(len(first_connects)))
             except Exception as e:
                 self.logger.error(e)
             self.logger.info("============Next Page==============")
 
-    def test_page(self, search_url, page_no, css_selector_identifier):
+    def test_page(self, search_url, page_no, css_selector_identifier, timeout=10):
         web_address_navigator(Settings,self.browser, search_url)
         self.logger.info("Testing page: {}".format(page_no))
-        if len(self.browser.find_elements_by_css_selector(css_selector_identifier)) > 0:
+        # wait for the results to render, at most `timeout` seconds
+        if explicit_wait(self.browser, "PEL", [css_selector_identifier, "CSS"],
+                         self.logger, timeout, notify=False):
             return True
         return False
 
+    def get_search_start(self, search_url, random_start, last_start):
+        """ Pick the page to start the search at, at random up to
+        `last_start` among the pages the search index knows of. Only a search
+        missing from the index gets its first page loaded, to count them.
+        Returns None if the search has no results """
+        index = get_search_index(search_url, self.logger)
+        if index is None:
+            if not self.test_page(search_url + "&page=1", 1,
+                                  "div.search-result__wrapper"):
+                return None
+
+            index = self.read_search_result_counts()
+            if not index["pages"]:
+                # the page doesn't tell how many pages it has
+                return 1
+            update_search_index(search_url, index["total"], index["pages"],
+                                self.logger)
+
+        self.logger.info("Search has {} results on {} pages".format(
+            index["total"], index["pages"]))
+        if not random_start:
+            return 1
+
+        return random.randint(1, max(1, min(last_start, index["pages"])))
+
+    def is_search_page_worked(self, search_url, page_no):
+        """ Check if the cached cards of the search page leave no one to
+        connect, all of them connected or pending already """
+        cards = get_cached_search_results(search_url, page_no, self.logger)
+        if not cards:
+            return False
+
+        return not any(card["action"] == "Connect" and card["username"] and
+                       not connect_restriction("read", card["username"],
+                                               self.connect_times,
+                                               self.logger)
+                       for card in cards)
+
     def search_and_connect(self,
               query,
               connection_relationship_code,
@@ -368,8 +575,10 @@ class LinkedinPy:
               random_start=True,
               max_pages=10,
               max_connects=25,
-              sleep_delay=6):
-        """ search linkedin and connect from a given profile """
+              sleep_delay=6,
+              prefetch=False):
+        """ search linkedin and connect from a given profile, with `prefetch`
+        loading the next page in a background tab meanwhile """
 
         if quota_supervisor(Settings, "connects") == "jump":
             return 0
@@ -390,28 +599,21 @@ class LinkedinPy:
         search_url = search_url + "&keywords=" + query
         search_url = search_url + "&origin=" + "FACETED_SEARCH"
 
-
-        temp_search_url = search_url + "&page=1"
-        print(temp_search_url)
-        time.sleep(10)
-        if self.test_page(search_url=temp_search_url, page_no=1, css_selector_identifier="div.search-result__wrapper")==False:
+        st = self.get_search_start(search_url, random_start, 4)
+        if st is None:
             self.logger.info("============Definitely no Result, Next Query==============")
             return 0
 
-        if random_start:
-            trial = 0
-            st = 5
-            while True and trial < 5 and st > 1:
-                st = random.randint(1, st-1)
-                temp_search_url = search_url + "&page=" + str(st)
-                if self.test_page(temp_search_url,st, "div.search-result__wrapper"):
-                    break
-                trial = trial + 1
-        else:
-            st = 1
+        prefetcher = (PagePrefetcher(self.browser, self.read_search_result_cards,
+                                     SEARCH_RESULT_CARD_CSS, self.logger)
+                      if prefetch else None)
 
         for page_no in list(range(st, st + max_pages)):
 
+            if self.is_search_page_worked(search_url, page_no):
+                self.logger.info("Skipping page {}, no one left to connect on it as of its cached results".format(page_no))
+                continue
+
             if prev_connects==connects:
                 self.logger.info("============Limits might have exceeded or all Invites pending from this page(let's exit either case)==============")
                 break
@@ -420,49 +622,55 @@ class LinkedinPy:
 
             try:
                 temp_search_url = search_url + "&page=" + str(page_no)
-                if page_no > st and st > 1:
-	                web_address_navigator(Settings,self.browser, temp_search_url)
+                cards = prefetcher.take(temp_search_url) if prefetcher else None
+                if cards is None:
+                    web_address_navigator(Settings,self.browser, temp_search_url)
+                    scroll_until_loaded(self.browser, SEARCH_RESULT_CARD_CSS)
+                    cards = self.read_search_result_cards()
                 self.logger.info("Starting page: {}".format(page_no))
 
-                for jc in range(2, 11):
-                    sleep(1)
-                    self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight/" + str(jc) + "-100);")
-
-                if len(self.browser.find_elements_by_css_selector("div.search-result__wrapper"))==0:
+                if len(cards)==0:
                     self.logger.info("============Last Page Reached or asking for Premium membership==============")
                     break
-                for i in range(0, len(self.browser.find_elements_by_css_selector("div.search-result__wrapper"))):
+
+                if (prefetcher and page_no + 1 < st + max_pages and
+                        not self.is_search_page_worked(search_url, page_no + 1)):
+                    prefetcher.start(search_url + "&page=" + str(page_no + 1))
+                for card in cards:
                     try:
-                        res_item = self.browser.find_elements_by_css_selector("li.search-result div.search-entity div.search-result__wrapper")[i]# div.search-result__actions div button")
-                        # pp.pprint(res_item.get_attribute('innerHTML'))
-                        link = res_item.find_element_by_css_selector("div > a")
-                        profile_link = link.get_attribute("href")
-                        self.logger.info("Profile : {}".format(profile_link))
-                        user_name = profile_link.split('/')[4]
-                        # self.logger.info("user_name : {}".format(user_name))
-                        name = res_item.find_element_by_css_selector("h3 > span > span > span")#//span/span/span[1]")
-                        self.logger.info("Name : {}".format(name.text))
+                        self.logger.info("Profile : {}".format(card["profile_url"]))
+                        user_name = card["username"]
+                        self.logger.info("Name : {}".format(card["name"]))
+
+                        if not user_name:
+                            self.logger.info("No username in the profile link, skipping")
+                            continue
 
                         if connect_restriction("read", user_name,  self.connect_times, self.logger):
                             self.logger.info("already connected")
                             continue
 
-                        try:
-                            connect_button = res_item.find_element_by_xpath("//div[3]/div/button[text()='Connect']")
-                            self.logger.info("Connect button found, connecting...")
-                            self.browser.execute_script("var evt = document.createEvent('MouseEvents');" + "evt.initMouseEvent('click',true, true, window, 0, 0, 0, 0, 0, false, false, false, false, 0,null);" + "arguments[0].dispatchEvent(evt);", res_item.find_element_by_xpath('//div[3]/div/button[text()="Connect"]'))
-                            self.logger.info("Clicked {}".format(connect_button.text))
-                            sleep(2)
-                        except Exception:
-                            invite_sent_button = res_item.find_element_by_xpath("//div[3]/div/button[text()='Invite Sent']")
-                            self.logger.info("Already {}".format(invite_sent_button.text))
+                        if card["action"]!="Connect":
+                            self.logger.info("Already {}".format(card["action"]))
                             continue
 
+                        if not claim_connect(user_name):
+                            self.logger.info("{} is being connected by another worker".format(user_name))
+                            continue
+
+                        self.logger.info("Connect button found, connecting...")
+                        if not click_search_result_action(self.browser, card["index"], "Connect"):
+                            raise Exception("Connect button of {} not found".format(user_name))
+                        self.logger.info("Clicked Connect")
+                        # wait for the invitation popup to show up
+                        explicit_wait(self.browser, "PEL", [CONNECT_POPUP_CSS, "CSS"],
+                                      self.logger, 5, notify=False)
+
                         try:
-                            modal = self.browser.find_element_by_css_selector("div.modal-wormhole-content > div")
+                            modal = selector_registry.find_element(self.browser, "connect_popup")
                             if modal:
                                 try:
-                                    sendnow_or_done_button = modal.find_element_by_xpath("//div[1]/div/section/div/div[2]/button[2]")#text()='Send now']")
+                                    sendnow_or_done_button = selector_registry.find_element(self.browser, "connect_popup_send_button", within=modal)
                                     self.logger.info(sendnow_or_done_button.text)
                                     if not (sendnow_or_done_button.text=='Done' or sendnow_or_done_button.text=='Send now'):
                                         raise Exception("Send Now or Done button not found")
@@ -473,6 +681,8 @@ class LinkedinPy:
                                          .perform())
                                         self.logger.info("Clicked {}".format(sendnow_or_done_button.text))
                                         connects = connects + 1
+                                        self.connected += 1
+                                        card["action"] = "Pending"
                                         connect_restriction("write", user_name, None, self.logger)
                                         try:
                                             # update server calls
@@ -483,7 +693,7 @@ class LinkedinPy:
                                     else:
                                         try:
                                             #TODO: input("find correct close XPATH")
-                                            close_button = modal.find_element_by_xpath("//div[1]/div/section/div/header/button")
+                                            close_button = selector_registry.find_element(self.browser, "connect_popup_close_button", within=modal)
                                             (ActionChains(self.browser)
                                              .move_to_element(close_button)
                                              .click()
@@ -499,7 +709,7 @@ class LinkedinPy:
                         except Exception as e:
                             print("Popup not found, Failed with:", e)
                             try:
-                                new_popup_buttons = self.browser.find_elements_by_css_selector("#artdeco-modal-outlet div.artdeco-modal-overlay div.artdeco-modal div.artdeco-modal__actionbar button.artdeco-button")
+                                new_popup_buttons = selector_registry.find_elements(self.browser, "connect_new_popup_buttons")
                                 gotit_button = new_popup_buttons[1]
                                 (ActionChains(self.browser)
                                  .move_to_element(gotit_button)
@@ -514,16 +724,25 @@ class LinkedinPy:
                         delay_random = random.randint(
                                     ceil(sleep_delay * 0.85),
                                     ceil(sleep_delay * 1.14))
-                        sleep(delay_random)
+                        if prefetcher:
+                            prefetcher.pause(delay_random)
+                        else:
+                            sleep(delay_random)
                         if connects >= max_connects:
                             self.logger.info("max_connects({}) for this iteration reached , Returning...".format(max_connects))
-                            return
+                            break
                     except Exception as e:
                         self.logger.error(e)
+                cache_search_results(search_url, page_no, cards, self.logger)
             except Exception as e:
                 self.logger.error(e)
+            if connects >= max_connects:
+                break
             self.logger.info("============Next Page==============")
-            return connects
+
+        if prefetcher:
+            prefetcher.discard()
+        return connects
 
     def endorse(self,
               profile_link,
@@ -531,19 +750,17 @@ class LinkedinPy:
         try:
             web_address_navigator(Settings,self.browser, profile_link)
 
-            for jc in range(1, 10):
-                sleep(1)
-                self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight*" + str(jc) + "/10);")
+            scroll_until_loaded(self.browser, "section.pv-skill-categories-section")
 
-            skills_pane = self.browser.find_element_by_css_selector("div.profile-detail > div.pv-deferred-area > div > section.pv-profile-section.pv-skill-categories-section")
+            skills_pane = selector_registry.find_element(self.browser, "skills_pane")
             if (skills_pane.text.split('\n')[0] == 'Skills & Endorsements'):
                 try:
-                    first_skill_button_icon = self.browser.find_element_by_css_selector("div.profile-detail > div.pv-deferred-area > div > section.pv-profile-section.pv-skill-categories-section > ol > li > div > div > div > button > li-icon")
+                    first_skill_button_icon = selector_registry.find_element(self.browser, "first_skill_button_icon")
                     button_type = first_skill_button_icon.get_attribute("type")
                     if button_type=='plus-icon':
-                        first_skill_button = self.browser.find_element_by_css_selector("div.profile-detail > div.pv-deferred-area > div > section.pv-profile-section.pv-skill-categories-section > ol > li > div > div > div > button")
+                        first_skill_button = selector_registry.find_element(self.browser, "first_skill_button")
                         self.browser.execute_script("var evt = document.createEvent('MouseEvents');" + "evt.initMouseEvent('click',true, true, window, 0, 0, 0, 0, 0, false, false, false, false, 0,null);" + "arguments[0].dispatchEvent(evt);", first_skill_button)
-                        first_skill_title = self.browser.find_element_by_css_selector("div.profile-detail > div.pv-deferred-area > div > section.pv-profile-section.pv-skill-categories-section > ol > li > div > div > p > a > span")
+                        first_skill_title = selector_registry.find_element(self.browser, "first_skill_title")
                         print(first_skill_title.text, "clicked")
                         delay_random = random.randint(
                                     ceil(sleep_delay * 0.85),
@@ -582,45 +799,26 @@ class LinkedinPy:
         search_url = search_url + "&keywords=" + query
         search_url = search_url + "&origin=" + "FACETED_SEARCH"
 
-        if random_start:
-            trial = 0
-            while True and trial < 3:
-                st = random.randint(1, 3)
-                temp_search_url = search_url + "&page=" + str(st)
-                web_address_navigator(Settings,self.browser, temp_search_url)
-                self.logger.info("Testing page:".format(st))
-                result_items = self.browser.find_elements_by_css_selector("div.search-result__wrapper")
-                if len(result_items) > 0:
-                    break
-                trial = trial + 1
-        else:
-            st = 1
+        st = self.get_search_start(search_url, random_start, 3)
+        if st is None:
+            self.logger.info("============Definitely no Result, Next Query==============")
+            return
 
         connects = 0
         for page_no in list(range(st, st + 1)):
             collected_profile_links = []
             try:
                 temp_search_url = search_url + "&page=" + str(page_no)
-                if page_no > st and st > 1:
-	                web_address_navigator(Settings,self.browser, temp_search_url)
+                web_address_navigator(Settings,self.browser, temp_search_url)
                 self.logger.info("Starting page: {}".format(page_no))
 
-                for jc in range(2, 11):
-                    sleep(1)
-                    self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight/" + str(jc) + "-100);")
-
-                result_items = self.browser.find_elements_by_css_selector("div.search-result__wrapper")
+                scroll_until_loaded(self.browser, SEARCH_RESULT_CARD_CSS)
 
-                # print(result_items)
-                for result_item in result_items:
-                    try:
-                        link = result_item.find_element_by_css_selector("div > a")
-                        self.logger.info("Profile : {}".format(link.get_attribute("href")))
-                        collected_profile_links.append(link.get_attribute("href"))
-                        name = result_item.find_element_by_css_selector("h3 > span > span > span")
-                        self.logger.info("Name : {}".format(name.text))
-                    except Exception as e:
-                        self.logger.error(e)
+                for card in self.read_search_result_cards():
+                    self.logger.info("Profile : {}".format(card["profile_url"]))
+                    if card["profile_url"]:
+                        collected_profile_links.append(card["profile_url"])
+                    self.logger.info("Name : {}".format(card["name"]))
             except Exception as e:
                 self.logger.error(e)
 
@@ -635,67 +833,25 @@ class LinkedinPy:
             self.logger.info("============Next Page==============")
 
 
-    def dump_connect_restriction(self, profile_name, logger, logfolder):
-        """ Dump connect restriction data to a local human-readable JSON """
-
-        try:
-            # get a DB and start a connection
-            db, id = get_database(Settings)
-            conn = sqlite3.connect(db)
-
-            with conn:
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
-
-                cur.execute(
-                    "SELECT * FROM connectRestriction WHERE profile_id=:var",
-                    {"var": id})
-                data = cur.fetchall()
-
-            if data:
-                # get the existing data
-                filename = "{}connectRestriction.json".format(logfolder)
-                if os.path.isfile(filename):
-                    with open(filename) as connectResFile:
-                        current_data = json.load(connectResFile)
-                else:
-                    current_data = {}
-
-                # pack the new data
-                connect_data = {user_data[1]: user_data[2] for user_data in
-                               data or []}
-                current_data[profile_name] = connect_data
-
-                # dump the fresh connect data to a local human readable JSON
-                with open(filename, 'w') as connectResFile:
-                    json.dump(current_data, connectResFile)
-
-        except Exception as exc:
-            logger.error(
-                "Pow! Error occurred while dumping connect restriction data to a "
-                "local JSON:\n\t{}".format(
-                    str(exc).encode("utf-8")))
-
-        finally:
-            if conn:
-                # close the open connection
-                conn.close()
-
     def end(self):
         """Closes the current session"""
 
         # IS_RUNNING = False
         close_browser(self.browser, False, self.logger)
 
-        with interruption_handler():
+        # signal handlers can only be set on the main thread, while an
+        # `AsyncLinkedinPy` session ends on its own
+        with interruption_handler(
+                threaded=threading.current_thread() is not
+                threading.main_thread()):
             # close virtual display
             if self.nogui:
                 self.display.stop()
 
             # write useful information
-            self.dump_connect_restriction(self.username,
-                                    self.logger,
-                                    self.logfolder)
+            export_connect_restriction(self.username,
+                                       self.logger,
+                                       self.logfolder)
             # dump_record_activity(self.username,
             #                      self.logger,
             #                      self.logfolder,
@@ -705,9 +861,20 @@ class LinkedinPy:
                     as connectFile:
                 connectFile.write(str(self.connected))
 
+            # write the buffered activity records before leaving the DB
+            flush_activity(Settings)
+
+            # release the long-lived DB connections of the session
+            close_connections()
+
             # output live stats before leaving
             self.live_report()
 
+            if self.network_policy:
+                self.network_policy.report(self.logger)
+
+            selector_registry.report(self.logger)
+
             message = "Session ended!"
             highlight_print(Settings, self.username, message, "end", "info", self.logger)
             print("\n\n")
@@ -800,17 +967,32 @@ class LinkedinPy:
                                     "Please use supported formats."
                                     "\t~disabled QS")
 
+    def get_live_stats(self):
+        """ Get the sessional statistics as a dictionary """
+        stats = {"liked_img": self.liked_img,
+                 "already_liked": self.already_liked,
+                 "commented": self.commented,
+                 "connected": self.connected,
+                 "already_connected": self.already_connected,
+                 "unconnected": self.unconnected,
+                 "liked_comments": self.liked_comments,
+                 "replied_to_comments": self.replied_to_comments,
+                 "inap_img": self.inap_img,
+                 "not_valid_users": self.not_valid_users,
+                 "run_time": self.run_time()}
+        if self.network_policy:
+            policy_stats = self.network_policy.get_stats()
+            stats["blocked_requests"] = policy_stats["blocked_requests"]
+            stats["saved_bytes"] = policy_stats["saved_bytes"]
+
+        return stats
+
     def live_report(self):
         """ Report live sessional statistics """
 
         print('')
 
-        stats = [self.liked_img, self.already_liked,
-                 self.commented,
-                 self.connected, self.already_connected,
-                 self.unconnected,
-                 self.inap_img,
-                 self.not_valid_users]
+        stats = self.get_live_stats()
 
         if self.connecting_num and self.connected_by:
             owner_relationship_info = (
@@ -821,40 +1003,24 @@ class LinkedinPy:
         else:
             owner_relationship_info = ''
 
-        sessional_run_time = self.run_time()
-        run_time_info = ("{} seconds".format(sessional_run_time) if
-                         sessional_run_time < 60 else
-                         "{} minutes".format(truncate_float(
-                             sessional_run_time / 60, 2)) if
-                         sessional_run_time < 3600 else
-                         "{} hours".format(truncate_float(
-                             sessional_run_time / 60 / 60, 2)))
-        run_time_msg = "[Session lasted {}]".format(run_time_info)
-
-        if any(stat for stat in stats):
+        run_time_msg = "[Session lasted {}]".format(
+            format_run_time(stats["run_time"]))
+
+        if any(stats[stat] for stat in stats if stat != "run_time"):
             self.logger.info(
                 "Sessional Live Report:\n"
-                "\t|> LIKED {} images  |  ALREADY LIKED: {}\n"
-                "\t|> COMMENTED on {} images\n"
-                "\t|> connected {} users  |  ALREADY connected: {}\n"
-                "\t|> UNconnected {} users\n"
-                "\t|> LIKED {} comments\n"
-                "\t|> REPLIED to {} comments\n"
-                "\t|> INAPPROPRIATE images: {}\n"
-                "\t|> NOT VALID users: {}\n"
-                "\n{}\n{}"
-                .format(self.liked_img,
-                        self.already_liked,
-                        self.commented,
-                        self.connected,
-                        self.already_connected,
-                        self.unconnected,
-                        self.liked_comments,
-                        self.replied_to_comments,
-                        self.inap_img,
-                        self.not_valid_users,
-                        owner_relationship_info,
-                        run_time_msg))
+                "\t|> LIKED {liked_img} images  |  "
+                "ALREADY LIKED: {already_liked}\n"
+                "\t|> COMMENTED on {commented} images\n"
+                "\t|> connected {connected} users  |  "
+                "ALREADY connected: {already_connected}\n"
+                "\t|> UNconnected {unconnected} users\n"
+                "\t|> LIKED {liked_comments} comments\n"
+                "\t|> REPLIED to {replied_to_comments} comments\n"
+                "\t|> INAPPROPRIATE images: {inap_img}\n"
+                "\t|> NOT VALID users: {not_valid_users}\n"
+                .format(**stats) +
+                "\n{}\n{}".format(owner_relationship_info, run_time_msg))
         else:
             self.logger.info("Sessional Live Report:\n"
                              "\t|> No any statistics to show\n"
@@ -875,8 +1041,7 @@ class LinkedinPy:
         usualjobslink = "https://www.linkedin.com/jobs"
         web_address_navigator(Settings,self.browser, usualjobslink)
 
-        job_title_XP = '//input[contains(@id,"jobs-search-box-keyword-id")]'
-        txt_job_title = self.browser.find_element_by_xpath(job_title_XP)
+        txt_job_title = selector_registry.find_element(self.browser, "job_title_input", timeout=10)
         print('Entering Job Title')
         (ActionChains(self.browser)
             .move_to_element(txt_job_title)
@@ -884,8 +1049,7 @@ class LinkedinPy:
             .send_keys("Python Developer")
             .perform())
         
-        job_location_XP = '//input[contains(@id,"jobs-search-box-location-id")]'
-        txt_job_location = self.browser.find_element_by_xpath(job_location_XP)
+        txt_job_location = selector_registry.find_element(self.browser, "job_location_input")
         print('Entering Job Location')
         (ActionChains(self.browser)
             .move_to_element(txt_job_location)
@@ -899,18 +1063,19 @@ class LinkedinPy:
 
         sleep(1)
         print("Clicking Search Button")
-        job_search_XP = '//button[contains(@class,"jobs-search-box__submit-button")]'
-        btn_job_search = self.browser.find_element_by_xpath(job_search_XP)
+        btn_job_search = selector_registry.find_element(self.browser, "job_search_button")
         print(btn_job_search)
         (ActionChains(self.browser)
             .move_to_element(btn_job_search)
             .click()
             .perform())
+        forget_navigation(self.browser)
         
         # update server calls
         update_activity(Settings)
 
-        sleep(10)
+        explicit_wait(self.browser, "PEL", ["div.jobs-search-results", "CSS"],
+                      self.logger, 10)
         input("Press Enter to continue...")
 
     def search_and_apply(self,
@@ -936,7 +1101,6 @@ class LinkedinPy:
 
         temp_job_search_url = job_search_url + "&start=0"
         print(temp_job_search_url)
-        time.sleep(10)
         if self.test_page(search_url=temp_job_search_url, page_no=1, css_selector_identifier = "div.jobs-search-results ") == False:
             self.logger.info("============Definitely no Result, Next Query==============")
             return 0
@@ -960,13 +1124,12 @@ class LinkedinPy:
                     web_address_navigator(Settings,self.browser, temp_job_search_url)
                 self.logger.info("Starting page: {}".format(page_no))
 
-                for jc in range(2, 11):
-                    sleep(1)
-                    self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight/" + str(jc) + "-100);")
-                if len(self.browser.find_elements_by_css_selector("div.jobs-search-results"))==0:
+                scroll_until_loaded(self.browser, "div.jobs-search-results li")
+                job_results = selector_registry.find_elements(self.browser, "job_search_results")
+                if len(job_results)==0:
                     self.logger.info("============Last Page Reached or asking for Premium membership==============")
                     break
-                for i in range(0, len(self.browser.find_elements_by_css_selector("div.jobs-search-results"))):
+                for i in range(0, len(job_results)):
                     print(i)
             except Exception as e:
                 self.logger.error(e)   
@@ -1000,4 +1163,6 @@ def smart_run(session):
             raise
 
     finally:
+        # never lose the buffered activity, even if `end` fails on its way
+        flush_activity(Settings)
         session.end()
@@ -1,8 +1,10 @@
 """Module only used for the login part of the script"""
 # import built-in & third-party modules
-import time
-# import pickle
+# import time
+import os
+import pickle
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.common.exceptions import WebDriverException
 
 # import LinkedinPy modules
 from socialcommons.time_util import sleep
@@ -12,8 +14,14 @@ from .util import web_address_navigator
 # from .util import click_element
 from .util import get_current_url
 from .util import explicit_wait
+from .util import add_cookies
+from .util import forget_navigation
 from .settings import Settings
 
+# where a logged in user lands, and an anonymous one is redirected from
+FEED_URL = "https://www.linkedin.com/feed/"
+
+
 def login_user(browser,
                username,
                userid,
@@ -28,21 +36,20 @@ def login_user(browser,
     assert password, 'Password not provided'
 
     print(username, password)
+    cookie_file = '{0}{1}_cookie.pkl'.format(logfolder, username)
+
+    # the cookies of the last login skip the login form while they're valid
+    if login_with_cookies(browser, cookie_file, logger):
+        save_cookies(browser, cookie_file, logger)
+        return True
+
     ig_homepage = "https://www.linkedin.com/login/"
     web_address_navigator(Settings, browser, ig_homepage)
-    # cookie_loaded = False
-
-    # try to load cookie from username
-    # try:
-    #     for cookie in pickle.load(open('{0}{1}_cookie.pkl'
-    #                                    .format(logfolder, username), 'rb')):
-    #         browser.add_cookie(cookie)
-    #         cookie_loaded = True
-    # except (WebDriverException, OSError, IOError):
-    #     print("Cookie file not found, creating cookie...")
 
-    # include time.sleep(1) to prevent getting stuck on google.com
-    time.sleep(1)
+    # wait until the login form is there to prevent getting stuck
+    input_username_XP = '//*[@id="username"]'
+    explicit_wait(browser, "VOEL", [input_username_XP, "XPath"], logger,
+                  Settings.page_delay)
 
     # changes linkedin website language to english to use english xpaths
     # if switch_language:
@@ -112,10 +119,6 @@ def login_user(browser,
     # login_page_title = "Login"
     # explicit_wait(browser, "TC", login_page_title, logger)
 
-    # wait until the 'username' input element is located and visible
-    input_username_XP = '//*[@id="username"]'
-    # explicit_wait(browser, "VOEL", [input_username_XP, "XPath"], logger)
-
     input_username = browser.find_element_by_xpath(input_username_XP)
 
     print('Entering username')
@@ -129,6 +132,7 @@ def login_user(browser,
     for i in range(2):
         update_activity(Settings)
 
+    # human-like pacing between the fields
     sleep(1)
 
     #  password
@@ -147,20 +151,24 @@ def login_user(browser,
     for i in range(2):
         update_activity(Settings)
 
+    # human-like pacing before submitting
     sleep(1)
 
     print('Submitting login_button')
+    login_page_url = get_current_url(browser)
     login_button = browser.find_element_by_xpath('//*[@type="submit"]')
 
     (ActionChains(browser)
      .move_to_element(login_button)
      .click()
      .perform())
+    forget_navigation(browser)
 
     # update server calls
     update_activity(Settings)
 
-    sleep(10)
+    # wait until the submitted form leaves the login page
+    explicit_wait(browser, "UC", [login_page_url], logger, 15)
 
     # dismiss_get_app_offer(browser, logger)
     # dismiss_notification_offer(browser, logger)
@@ -170,20 +178,74 @@ def login_user(browser,
 
     # wait until page fully load
     current_url = get_current_url(browser)
-    if current_url !=  "https://www.linkedin.com/feed/":
+    if current_url !=  FEED_URL:
         explicit_wait(browser, "PFL", [], logger, 5)
 
-    # Check if user is logged-in (If there's two 'nav' elements)
-    current_url = get_current_url(browser)
-    if current_url == "https://www.linkedin.com/feed/":
+    # Check if user is logged-in
+    if is_logged_in(browser):
+        # create cookie for username
+        save_cookies(browser, cookie_file, logger)
         return True
     else:
         return False
 
 
-    # nav = browser.find_elements_by_xpath('//div[@role="navigation"]')
-    # if len(nav) == 2:
-    #     # create cookie for username
-    #     pickle.dump(browser.get_cookies(), open(
-    #         '{0}{1}_cookie.pkl'.format(logfolder, username), 'wb'))
+def is_logged_in(browser):
+    """ Check if the browser is on the feed, where LinkedIn only lets the
+    logged in users stay """
+    current_url = get_current_url(browser)
+    return bool(current_url) and current_url.startswith(FEED_URL)
+
+
+def login_with_cookies(browser, cookie_file, logger):
+    """ Restore the cookies saved by the last login and check if they still
+    keep the user logged in """
+    if not os.path.isfile(cookie_file):
+        return False
 
+    try:
+        with open(cookie_file, 'rb') as cookieFile:
+            cookies = pickle.load(cookieFile)
+
+        # cookies can only be set on a page of their domain
+        web_address_navigator(Settings, browser, "https://www.linkedin.com/")
+        if add_cookies(browser, cookies):
+            web_address_navigator(Settings, browser, FEED_URL)
+
+            if is_logged_in(browser):
+                logger.info("Logged in with the saved cookies")
+                return True
+
+        logger.info("The saved cookies have expired, logging in again...")
+
+    except (WebDriverException, OSError, IOError, EOFError,
+            pickle.UnpicklingError) as exc:
+        logger.warning(
+            "Dap! Error occurred while restoring the saved cookies:\n\t{}"
+            .format(str(exc).encode("utf-8")))
+
+    # don't let the stale cookies get in the way of the login form, which
+    # must be loaded again without them
+    browser.delete_all_cookies()
+    forget_navigation(browser)
+    return False
+
+
+def save_cookies(browser, cookie_file, logger):
+    """ Save the cookies of the logged in session for the next start, in a
+    file only the user can read as they hold the session token """
+    try:
+        cookies = browser.get_cookies()
+
+        if os.path.isfile(cookie_file):
+            # tighten the file saved by older versions
+            os.chmod(cookie_file, 0o600)
+        fd = os.open(cookie_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                     0o600)
+        with os.fdopen(fd, 'wb') as cookieFile:
+            pickle.dump(cookies, cookieFile)
+
+    except (WebDriverException, OSError, IOError) as exc:
+        logger.warning(
+            "Dap! Error occurred while saving the cookies:\n\t{}"
+            .format(str(exc).encode("utf-8")))
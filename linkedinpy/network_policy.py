@@ -0,0 +1,146 @@
+""" Module which blocks the resources a session never looks at, e.g. images
+and trackers, before the browser requests them """
+import threading
+from fnmatch import fnmatch
+
+from selenium.common.exceptions import WebDriverException
+
+# URL patterns (`*` matches anything) of each blockable resource category
+RESOURCE_PATTERNS = {
+    "images": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*",
+               "*media.licdn.com/dms/image/*", "*static.licdn.com/*/img/*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*",
+              "*dms.licdn.com/playlist/*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "trackers": ["*doubleclick.net/*", "*google-analytics.com/*",
+                 "*googletagmanager.com/*", "*googleadservices.com/*",
+                 "*facebook.net/*", "*bat.bing.com/*", "*ads.linkedin.com/*",
+                 "*scorecardresearch.com/*", "*linkedin.com/li/track*"],
+}
+
+# rough average size of a blocked resource of each category, in bytes
+RESOURCE_SIZES = {
+    "images": 40000,
+    "media": 800000,
+    "fonts": 50000,
+    "trackers": 15000,
+    "patterns": 20000,
+}
+
+# URLs of the resources a page refers to from its DOM
+PAGE_RESOURCES_JS = """
+var urls = [];
+var elements = document.querySelectorAll(
+    "img, video, audio, source, iframe, script[src], link[href]");
+for (var i = 0; i < elements.length; i++) {
+    var url = elements[i].currentSrc || elements[i].src || elements[i].href;
+    if (url && urls.indexOf(url) < 0) {
+        urls.push(url);
+    }
+}
+return urls;
+"""
+
+
+class NetworkPolicy:
+    """ Blocks the requests of the given resource categories and URL
+    patterns, and estimates what it saved """
+    def __init__(self, categories=None, url_patterns=None):
+        categories = (list(RESOURCE_PATTERNS) if categories is None
+                      else list(categories))
+        for category in categories:
+            if category not in RESOURCE_PATTERNS:
+                raise ValueError("Unknown resource category '{}', choose from"
+                                 " {}".format(category,
+                                              ", ".join(RESOURCE_PATTERNS)))
+
+        self.categories = categories
+        self.url_patterns = list(url_patterns or [])
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.blocked = {category: 0 for category in self.categories}
+        if self.url_patterns:
+            self.blocked["patterns"] = 0
+
+    def get_patterns(self):
+        """ Get all the URL patterns the policy blocks """
+        patterns = []
+        for category in self.categories:
+            patterns.extend(RESOURCE_PATTERNS[category])
+
+        return patterns + self.url_patterns
+
+    def apply(self, browser, logger):
+        """ Make the browser block the requests of the policy, returns False
+        if the browser can't do it """
+        if not hasattr(browser, "execute_cdp_cmd"):
+            # Firefox only blocks the images, with `disable_image_load`
+            logger.warning("Resource blocking needs Chrome, "
+                           "loading all the resources")
+            return False
+
+        try:
+            browser.execute_cdp_cmd("Network.enable", {})
+            browser.execute_cdp_cmd("Network.setBlockedURLs",
+                                    {"urls": self.get_patterns()})
+
+        except WebDriverException as exc:
+            logger.warning(
+                "Wah! Error occurred while blocking resources:\n\t{}"
+                .format(str(exc).encode("utf-8")))
+            return False
+
+        logger.info("Blocking the requests of {}".format(
+            ", ".join(self.categories + (["URL patterns"]
+                                         if self.url_patterns else []))))
+        return True
+
+    def get_category(self, url):
+        """ Get the category of the URL if the policy blocks it """
+        for category in self.categories:
+            if any(fnmatch(url, pattern)
+                   for pattern in RESOURCE_PATTERNS[category]):
+                return category
+
+        if any(fnmatch(url, pattern) for pattern in self.url_patterns):
+            return "patterns"
+
+        return None
+
+    def count_blocked(self, browser):
+        """ Count the resources the loaded page refers to and the policy
+        blocked. Blocked requests can't be observed without CDP events, so
+        the count misses the ones made by scripts and style sheets """
+        try:
+            urls = browser.execute_script(PAGE_RESOURCES_JS) or []
+        except WebDriverException:
+            return
+
+        with self.lock:
+            self.pages += 1
+            for url in urls:
+                category = self.get_category(url)
+                if category:
+                    self.blocked[category] += 1
+
+    def get_stats(self):
+        """ Get the blocked request counts and the estimated bytes saved """
+        with self.lock:
+            blocked = dict(self.blocked)
+
+        return {"pages": self.pages,
+                "blocked": blocked,
+                "blocked_requests": sum(blocked.values()),
+                "saved_bytes": sum(count * RESOURCE_SIZES[category]
+                                   for category, count in blocked.items())}
+
+    def report(self, logger):
+        stats = self.get_stats()
+        logger.info(
+            "Network Policy Report:\n"
+            "\t|> BLOCKED {} requests on {} pages ({})\n"
+            "\t|> SAVED about {} KB".format(
+                stats["blocked_requests"], stats["pages"],
+                ", ".join("{} {}".format(count, category)
+                          for category, count in stats["blocked"].items()),
+                stats["saved_bytes"] // 1000))
@@ -0,0 +1,243 @@
+""" Orchestrator which runs the campaigns of many accounts, each LinkedinPy
+session in its own worker process
+
+```
+python -m linkedinpy.orchestrator accounts.json --processes 3
+```
+
+The accounts file is a JSON list of accounts, each with its campaigns run
+in order and the `LinkedinPy` options of its session:
+
+```
+[{"username": "abc@example.com",
+  "password": "123",
+  "options": {"headless_browser": true, "disable_image_load": true},
+  "campaigns": [{"action": "search_and_connect",
+                 "kwargs": {"query": "founder"}},
+                {"action": "withdraw_old_invitations"}]}]
+```
+"""
+import json
+import logging
+import os
+import sys
+import time
+import multiprocessing
+from argparse import ArgumentParser
+
+try:
+    import fcntl
+except ImportError:
+    # no `flock` on Windows
+    fcntl = None
+
+from socialcommons.file_manager import set_workspace
+
+from .linkedinpy import LinkedinPy
+from .linkedinpy import smart_run
+from .settings import Settings
+from .util import format_run_time
+
+# session methods which a campaign can run
+CAMPAIGN_ACTIONS = ["set_quota_supervisor",
+                    "search_and_connect",
+                    "search_and_endorse",
+                    "search_1stconnects_and_savetodb",
+                    "withdraw_old_invitations",
+                    "run_parallel_jobs"]
+
+
+def load_accounts(filename):
+    """ Read the accounts file and check its campaigns before any session
+    starts """
+    with open(filename) as accountsFile:
+        accounts = json.load(accountsFile)
+
+    for account in accounts:
+        if not account.get("username"):
+            raise ValueError("An account in '{}' has no username"
+                             .format(filename))
+
+        for campaign in account.get("campaigns", []):
+            if campaign.get("action") not in CAMPAIGN_ACTIONS:
+                raise ValueError("'{}' can't be run as a campaign of '{}'"
+                                 .format(campaign.get("action"),
+                                         account["username"]))
+
+    return accounts
+
+
+def run_campaign(session, campaign):
+    """ Run a campaign, i.e. an `action` of `CAMPAIGN_ACTIONS` with its
+    `kwargs`, on the given session """
+    if campaign.get("action") not in CAMPAIGN_ACTIONS:
+        raise ValueError("'{}' can't be run as a campaign"
+                         .format(campaign.get("action")))
+
+    action = getattr(session, campaign["action"])
+    kwargs = campaign.get("kwargs", {})
+
+    if campaign["action"] == "set_quota_supervisor":
+        return action(Settings, **kwargs)
+
+    return action(**kwargs)
+
+
+def init_worker(workspace):
+    """ Prepare a fresh worker process for its LinkedinPy session """
+    set_workspace(Settings, path=workspace)
+    # the sessions take their options from the accounts file, not from the
+    # command line of the orchestrator
+    sys.argv = sys.argv[:1]
+
+
+def run_account(account):
+    """ Run the campaigns of an account in a session of its own and return
+    the live stats of the session, or the error which stopped it """
+    username = account["username"]
+    options = dict(account.get("options", {}))
+    # the accounts never share a DB, so their writes never wait on each other
+    options["split_db"] = True
+
+    session = None
+    try:
+        session = LinkedinPy(username=username,
+                             password=account.get("password"),
+                             **options)
+
+        with smart_run(session):
+            for campaign in account.get("campaigns", []):
+                run_campaign(session, campaign)
+
+        error = None
+
+    except (Exception, SystemExit) as exc:
+        error = str(exc) or exc.__class__.__name__
+
+    return {"username": username,
+            "stats": session.get_live_stats() if session else None,
+            "error": error}
+
+
+def run_accounts(accounts, processes, workspace, logger):
+    """ Run the accounts on at most `processes` sessions at a time and
+    return the results of the finished ones """
+    results = []
+    # a worker process per account never leaks the global settings of one
+    # session into the next
+    pool = multiprocessing.Pool(processes=processes,
+                                initializer=init_worker,
+                                initargs=(workspace,),
+                                maxtasksperchild=1)
+    try:
+        for result in pool.imap_unordered(run_account, accounts):
+            logger.info("'{}' has finished{}".format(
+                result["username"],
+                " with error: {}".format(result["error"])
+                if result["error"] else ""))
+            results.append(result)
+
+        pool.close()
+
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, stopping the remaining sessions")
+        pool.terminate()
+
+    finally:
+        pool.join()
+
+    return results
+
+
+def aggregate_stats(results):
+    """ Sum the live stats of all the sessions """
+    totals = {}
+    for result in results:
+        for stat, value in (result["stats"] or {}).items():
+            totals[stat] = totals.get(stat, 0) + value
+
+    return totals
+
+
+def report(results, run_time, logger):
+    """ Report the live stats of each account and their totals """
+    lines = []
+    for result in sorted(results, key=lambda result: result["username"]):
+        stats = result["stats"] or {}
+        lines.append("\t|> {}: connected {} users, unconnected {} users{}"
+                     .format(result["username"],
+                             stats.get("connected", 0),
+                             stats.get("unconnected", 0),
+                             "  |  FAILED: {}".format(result["error"])
+                             if result["error"] else ""))
+
+    totals = aggregate_stats(results)
+    failed = len([result for result in results if result["error"]])
+
+    logger.info(
+        "Orchestrator Live Report:\n{}\n"
+        "\t|> TOTAL connected {} users  |  ALREADY connected: {}\n"
+        "\t|> TOTAL UNconnected {} users\n"
+        "\t|> {} accounts finished, {} of them failed\n"
+        "\n[Orchestrator lasted {}]"
+        .format("\n".join(lines),
+                totals.get("connected", 0),
+                totals.get("already_connected", 0),
+                totals.get("unconnected", 0),
+                len(results), failed,
+                format_run_time(int(run_time))))
+
+
+def acquire_lock(filename):
+    """ Lock the given file so a single process at a time works on what it
+    guards, returns the open lock file or None if it's already locked """
+    lockFile = open(filename, 'w')
+    if fcntl is None:
+        return lockFile
+
+    try:
+        fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        lockFile.close()
+        return None
+
+    return lockFile
+
+
+def main():
+    """ Run the accounts of an accounts file from the command line """
+    parser = ArgumentParser(
+        prog="linkedinpy.orchestrator",
+        description="Run the campaigns of many LinkedinPy accounts, each "
+                    "session in its own worker process")
+    parser.add_argument("accounts", help="Accounts file, e.g. accounts.json")
+    parser.add_argument(
+        "--processes", type=int, default=2,
+        help="Sessions running at the same time")
+    parser.add_argument(
+        "--workspace", default=None,
+        help="Workspace folder, your home folder by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("linkedinpy.orchestrator")
+
+    lockFile = acquire_lock("{}.lock".format(os.path.abspath(args.accounts)))
+    if lockFile is None:
+        logger.error("'{}' is already being run".format(args.accounts))
+        sys.exit(1)
+
+    with lockFile:
+        accounts = load_accounts(args.accounts)
+
+        start_time = time.time()
+        results = run_accounts(accounts, args.processes, args.workspace,
+                               logger)
+        report(results, time.time() - start_time, logger)
+
+    if any(result["error"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+""" Module which parses a snapshot of a page, e.g. `browser.page_source` or
+a saved HTML file, into the same card records the live reads give
+
+```
+python -m linkedinpy.page_parser search_page.html
+python -m linkedinpy.page_parser --invitations sent_invitations_page.html
+```
+"""
+import json
+import re
+import time
+from argparse import ArgumentParser
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from .search_util import SEARCH_RESULT_CARD_CSS
+from .search_util import SENT_INVITATION_CARD_CSS
+from .search_util import SEARCH_RESULT_TOTAL_CSS
+from .search_util import SEARCH_PAGE_BUTTON_CSS
+from .search_util import count_search_pages
+from .search_util import get_username_from_url
+
+# elements which never have children nor an end tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+             "link", "meta", "param", "source", "track", "wbr"}
+
+# elements whose content is not text of the page
+RAW_TEXT_TAGS = {"script", "style", "template", "noscript"}
+
+# `tag.class#id[attr=value]:nth-child(n)` parts of a compound selector
+SELECTOR_PART = re.compile(
+    r"([.#])([\w-]+)"
+    r"|\[([\w-]+)(?:=[\"']?([^\"'\]]*)[\"']?)?\]"
+    r"|:nth-child\((\d+)\)")
+
+
+class Node:
+    """ Element of the parsed page, the document itself has no tag """
+    __slots__ = ("tag", "attrs", "classes", "children", "parent", "position",
+                 "elements")
+
+    def __init__(self, tag=None, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or [])
+        self.classes = set((self.attrs.get("class") or "").split())
+        self.children = []
+        self.parent = parent
+        self.position = 0
+        self.elements = 0
+
+    def append(self, child):
+        if isinstance(child, Node):
+            # 1-based position among the element siblings, for `nth-child`
+            self.elements += 1
+            child.position = self.elements
+        self.children.append(child)
+
+    def get(self, name):
+        return self.attrs.get(name)
+
+    @property
+    def text(self):
+        """ Text content of the element, trimmed like `textContent.trim()` """
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif node.tag not in RAW_TEXT_TAGS:
+                stack.extend(reversed(node.children))
+
+        return "".join(parts).strip()
+
+    def select(self, selector):
+        """ Get the descendants matching the CSS selector, in the order of
+        the page, like `querySelectorAll` """
+        groups = [parse_selector(group) for group in selector.split(",")]
+
+        found = []
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Node):
+                continue
+
+            if any(matches(node, steps) for steps in groups):
+                found.append(node)
+            stack.extend(reversed(node.children))
+
+        return found
+
+    def select_one(self, selector):
+        found = self.select(selector)
+        return found[0] if found else None
+
+
+class TreeBuilder(HTMLParser):
+    """ Builds the `Node` tree of a page, forgiving unclosed elements """
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.root = Node()
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, attrs, self.stack[-1])
+        self.stack[-1].append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].append(Node(tag, attrs, self.stack[-1]))
+
+    def handle_endtag(self, tag):
+        # close the elements left open inside it, ignore a stray end tag
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                break
+
+    def handle_data(self, data):
+        self.stack[-1].append(data)
+
+
+def parse_html(html):
+    """ Parse the HTML of a page into its document `Node` """
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+
+    return builder.root
+
+
+def parse_selector(selector):
+    """ Split a selector into (combinator, compound) steps, left to right """
+    steps = []
+    combinator = " "
+    for token in re.findall(r">|[^\s>]+", selector):
+        if token == ">":
+            combinator = ">"
+            continue
+
+        tag = re.match(r"[\w-]*|\*", token).group(0)
+        parts = SELECTOR_PART.findall(token[len(tag):])
+        steps.append((combinator, (tag.lower() if tag not in ("", "*")
+                                   else None, parts)))
+        combinator = " "
+
+    return steps
+
+
+def matches_compound(node, compound):
+    tag, parts = compound
+    if tag and node.tag != tag:
+        return False
+
+    for kind, name, attr, value, position in parts:
+        if kind == "." and name not in node.classes:
+            return False
+        if kind == "#" and node.get("id") != name:
+            return False
+        if attr and (attr not in node.attrs or
+                     (value and node.get(attr) != value)):
+            return False
+        if position and node.position != int(position):
+            return False
+
+    return True
+
+
+def matches(node, steps):
+    """ Check the node against the steps right to left, walking up through
+    all its ancestors like `querySelectorAll` does """
+    combinator, compound = steps[-1]
+    if not matches_compound(node, compound):
+        return False
+
+    if len(steps) == 1:
+        return True
+
+    ancestor = node.parent
+    while ancestor is not None and ancestor.tag is not None:
+        if matches(ancestor, steps[:-1]):
+            return True
+        if combinator == ">":
+            break
+        ancestor = ancestor.parent
+
+    return False
+
+
+def parse_search_result_cards(html, base_url="https://www.linkedin.com/"):
+    """ Get the result cards of a people search page, the same records as
+    `get_search_result_cards` reads from the live page """
+    cards = []
+    for index, card in enumerate(parse_html(html).select(
+            SEARCH_RESULT_CARD_CSS)):
+        link = card.select_one("div > a")
+        button = card.select_one("div.search-result__actions button")
+        name = card.select_one("h3 > span > span > span")
+        headline = card.select_one("p.subline-level-1")
+        profile_url = (urljoin(base_url, link.get("href"))
+                       if link and link.get("href") else None)
+
+        cards.append({
+            "index": index,
+            "profile_url": profile_url,
+            "username": get_username_from_url(profile_url),
+            "name": name.text if name else None,
+            "headline": headline.text if headline else None,
+            "action": button.text if button else None,
+            "action_enabled": (button is not None and
+                               "disabled" not in button.attrs)})
+
+    return cards
+
+
+def parse_search_result_counts(html):
+    """ Get the `total` results and the number of `pages` of a people search
+    page, the same as `get_search_result_counts` reads from the live page """
+    document = parse_html(html)
+    total = document.select_one(SEARCH_RESULT_TOTAL_CSS)
+    buttons = document.select(SEARCH_PAGE_BUTTON_CSS)
+
+    return count_search_pages(total.text if total else None,
+                              buttons[-1].text if buttons else None)
+
+
+def parse_sent_invitation_cards(html, base_url="https://www.linkedin.com/"):
+    """ Get the cards of a sent invitations page, the same records as
+    `get_sent_invitation_cards` reads from the live page """
+    cards = []
+    for index, card in enumerate(parse_html(html).select(
+            SENT_INVITATION_CARD_CSS)):
+        link = card.select_one("div > a")
+        sent = card.select_one("div > time")
+        profile_url = (urljoin(base_url, link.get("href"))
+                       if link and link.get("href") else None)
+
+        cards.append({
+            "index": index,
+            "profile_url": profile_url,
+            "username": get_username_from_url(profile_url),
+            "time": sent.text if sent else None})
+
+    return cards
+
+
+def main():
+    """ Print the cards parsed out of a saved page and how long it took """
+    parser = ArgumentParser(
+        prog="linkedinpy.page_parser",
+        description="Parse the cards of a saved LinkedIn page")
+    parser.add_argument("page", help="Saved HTML of the page")
+    parser.add_argument("--invitations", action="store_true",
+                        help="The page is the sent invitations page")
+    args = parser.parse_args()
+
+    with open(args.page, encoding="utf-8") as pageFile:
+        html = pageFile.read()
+
+    start_time = time.time()
+    if args.invitations:
+        cards = parse_sent_invitation_cards(html)
+    else:
+        cards = parse_search_result_cards(html)
+    parse_time = time.time() - start_time
+
+    print(json.dumps(cards, indent=2))
+    print("Parsed {} cards in {:.1f} ms".format(len(cards), parse_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+""" Module which loads the next page of a search in a background tab while
+the current page is being worked, so moving on to it is instant """
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from socialcommons.time_util import sleep
+from .util import update_activity
+from .util import scroll_until_loaded
+from .util import explicit_wait
+from .util import get_current_url
+from .util import track_navigation
+from .util import forget_navigation
+from .settings import Settings
+
+OPEN_TAB_JS = "window.open(arguments[0], '_blank');"
+
+
+class PagePrefetcher:
+    """ Keeps the next page of a search loading in its own tab. The pacing
+    delays between the actions on the current page are used to finish
+    loading it and to read its cards with `read_cards` """
+    def __init__(self, browser, read_cards, item_css, logger):
+        self.browser = browser
+        self.read_cards = read_cards
+        self.item_css = item_css
+        self.logger = logger
+        self.url = None
+        self.handle = None
+        self.cards = None
+        self.landed_url = None
+
+    def start(self, url):
+        """ Start loading the URL in a background tab, the current tab
+        stays the one driven """
+        self.discard()
+
+        try:
+            handles = set(self.browser.window_handles)
+            self.browser.execute_script(OPEN_TAB_JS, url)
+            # update server calls
+            update_activity(Settings)
+
+            opened = [handle for handle in self.browser.window_handles
+                      if handle not in handles]
+            if opened:
+                self.url, self.handle, self.cards = url, opened[0], None
+
+        except WebDriverException as exc:
+            self.logger.warning(
+                "Wah! Error occurred while prefetching {}:\n\t{}"
+                .format(url, str(exc).encode("utf-8")))
+
+    def work(self, wait=False):
+        """ Read the cards of the prefetched page once it has loaded, or
+        wait until it loads if `wait` is set """
+        if self.handle is None or self.cards is not None:
+            return
+
+        current_handle = self.browser.current_window_handle
+        try:
+            self.browser.switch_to.window(self.handle)
+            if wait:
+                explicit_wait(self.browser, "PFL", [], self.logger, 10,
+                              notify=False)
+            elif self.browser.execute_script(
+                    "return document.readyState") != "complete":
+                return
+
+            self.landed_url = get_current_url(self.browser)
+            scroll_until_loaded(self.browser, self.item_css)
+            self.cards = self.read_cards()
+
+        except WebDriverException as exc:
+            self.logger.warning(
+                "Wah! Error occurred while reading the prefetched page:\n\t{}"
+                .format(str(exc).encode("utf-8")))
+
+        finally:
+            self.browser.switch_to.window(current_handle)
+
+    def pause(self, seconds):
+        """ Sleep for a pacing delay, working the prefetched page in it """
+        start_time = time.time()
+        self.work()
+
+        remaining = seconds - (time.time() - start_time)
+        if remaining > 0:
+            sleep(remaining)
+
+    def take(self, url):
+        """ Move on to the prefetched tab if it holds the given URL, closing
+        the current tab, and return the cards read from it. Returns None if
+        the URL wasn't prefetched or its cards couldn't be read """
+        if self.handle is None or self.url != url:
+            self.discard()
+            return None
+
+        self.work(wait=True)
+        cards = self.cards
+
+        try:
+            self.browser.close()
+            self.browser.switch_to.window(self.handle)
+            # the driven tab is now the prefetched page
+            if self.landed_url:
+                track_navigation(self.browser, self.url, self.landed_url)
+            else:
+                forget_navigation(self.browser)
+
+        except WebDriverException as exc:
+            self.logger.warning(
+                "Wah! Error occurred while switching to the prefetched "
+                "page:\n\t{}".format(str(exc).encode("utf-8")))
+            forget_navigation(self.browser)
+            cards = None
+
+        self.url, self.handle, self.cards = None, None, None
+        self.landed_url = None
+        return cards
+
+    def discard(self):
+        """ Close the background tab, if any """
+        if self.handle is None:
+            return
+
+        current_handle = self.browser.current_window_handle
+        try:
+            self.browser.switch_to.window(self.handle)
+            self.browser.close()
+
+        except WebDriverException:
+            pass
+
+        finally:
+            self.browser.switch_to.window(current_handle)
+            self.url, self.handle, self.cards = None, None, None
+            self.landed_url = None
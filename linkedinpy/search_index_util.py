@@ -0,0 +1,105 @@
+""" Module which keeps the number of results and pages of each search, so a
+random start page can be picked without probing the pages, and the result
+cards of its pages lately read, so a worked page needn't be loaded again """
+import json
+import time
+
+from .util import normalize_url
+from .database_engine import get_database
+from .database_engine import get_connection
+from .database_engine import write_with_retry
+from .settings import Settings
+
+# the rows have no other columns, so replacing them on their unique keys is
+# an upsert even on SQLite older than 3.24
+UPSERT_SEARCH_INDEX = (
+    "INSERT OR REPLACE INTO searchIndex "
+    "(profile_id, search_url, total, pages, modified) "
+    "VALUES (?, ?, ?, ?, ?)")
+
+UPSERT_SEARCH_RESULTS = (
+    "INSERT OR REPLACE INTO searchResults "
+    "(profile_id, search_url, page, cards, modified) "
+    "VALUES (?, ?, ?, ?, ?)")
+
+
+def get_search_index(search_url, logger):
+    """ Get the known `total` results and `pages` of the search, None if it
+    isn't indexed or its entry is older than `Settings.search_index_ttl` """
+    try:
+        db, id = get_database(Settings)
+        conn = get_connection(db)
+
+        row = conn.execute(
+            "SELECT total, pages, modified FROM searchIndex WHERE "
+            "profile_id=:id_var AND search_url=:url",
+            {"id_var": id, "url": normalize_url(search_url)}).fetchone()
+
+        if row is None or (time.time() - row["modified"] >
+                           Settings.search_index_ttl):
+            return None
+
+        return {"total": row["total"], "pages": row["pages"]}
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred while reading the search index:\n\t{}"
+            .format(str(exc).encode("utf-8")))
+
+    return None
+
+
+def update_search_index(search_url, total, pages, logger):
+    """ Store the number of results and pages of the search """
+    try:
+        db, id = get_database(Settings)
+        write_with_retry(db, lambda conn: conn.execute(
+            UPSERT_SEARCH_INDEX,
+            (id, normalize_url(search_url), total, pages, int(time.time()))))
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred while updating the search index:\n\t{}"
+            .format(str(exc).encode("utf-8")))
+
+
+def get_cached_search_results(search_url, page_no, logger):
+    """ Get the result cards cached for the search page, None if there are
+    none or they're older than `Settings.search_results_ttl` """
+    try:
+        db, id = get_database(Settings)
+        conn = get_connection(db)
+
+        row = conn.execute(
+            "SELECT cards, modified FROM searchResults WHERE "
+            "profile_id=:id_var AND search_url=:url AND page=:page",
+            {"id_var": id, "url": normalize_url(search_url),
+             "page": page_no}).fetchone()
+
+        if row is None or (time.time() - row["modified"] >
+                           Settings.search_results_ttl):
+            return None
+
+        return json.loads(row["cards"])
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred while reading the cached search results:"
+            "\n\t{}".format(str(exc).encode("utf-8")))
+
+    return None
+
+
+def cache_search_results(search_url, page_no, cards, logger):
+    """ Store the result cards of the search page, as they are now """
+    try:
+        db, id = get_database(Settings)
+        write_with_retry(db, lambda conn: conn.execute(
+            UPSERT_SEARCH_RESULTS,
+            (id, normalize_url(search_url), page_no, json.dumps(cards),
+             int(time.time()))))
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred while caching the search results:\n\t{}"
+            .format(str(exc).encode("utf-8")))
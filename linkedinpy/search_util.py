@@ -0,0 +1,160 @@
+""" Module which reads and acts on the result cards of the people search
+and the cards of the sent invitations """
+import re
+from math import ceil
+
+# one result card of the people search
+SEARCH_RESULT_CARD_CSS = (
+    "li.search-result div.search-entity div.search-result__wrapper")
+
+# result count and page buttons of the people search
+SEARCH_RESULT_TOTAL_CSS = "h3.search-results__total"
+SEARCH_PAGE_BUTTON_CSS = "li.artdeco-pagination__indicator--number"
+
+# the people search shows 10 results a page, up to its 100th page
+SEARCH_RESULTS_PER_PAGE = 10
+SEARCH_MAX_PAGES = 100
+
+# one card of the sent invitations page
+SENT_INVITATION_CARD_CSS = "li.invitation-card div.pl5"
+
+# read every result card of the page in a single WebDriver round trip
+EXTRACT_SEARCH_RESULT_CARDS_JS = """
+var cards = document.querySelectorAll(arguments[0]);
+var text = function (card, selector) {
+    var element = card.querySelector(selector);
+    return element ? element.textContent.trim() : null;
+};
+return Array.prototype.map.call(cards, function (card, index) {
+    var link = card.querySelector("div > a");
+    var button = card.querySelector("div.search-result__actions button");
+    return {
+        "index": index,
+        "profile_url": link ? link.href : null,
+        "name": text(card, "h3 > span > span > span"),
+        "headline": text(card, "p.subline-level-1"),
+        "action": button ? button.textContent.trim() : null,
+        "action_enabled": button ? !button.disabled : false
+    };
+});
+"""
+
+# read the result count, e.g. 'Showing 1,234 results', and the number on
+# the last page button of the search page
+EXTRACT_SEARCH_RESULT_COUNTS_JS = """
+var total = document.querySelector(arguments[0]);
+var buttons = document.querySelectorAll(arguments[1]);
+return {
+    "total": total ? total.textContent.trim() : null,
+    "last_page": buttons.length ?
+        buttons[buttons.length - 1].textContent.trim() : null
+};
+"""
+
+# read every sent invitation card of the page in a single round trip
+EXTRACT_SENT_INVITATION_CARDS_JS = """
+var cards = document.querySelectorAll(arguments[0]);
+return Array.prototype.map.call(cards, function (card, index) {
+    var link = card.querySelector("div > a");
+    var sent = card.querySelector("div > time");
+    return {
+        "index": index,
+        "profile_url": link ? link.href : null,
+        "time": sent ? sent.textContent.trim() : null
+    };
+});
+"""
+
+# click the button of a result card the same way a mouse click does
+CLICK_SEARCH_RESULT_ACTION_JS = """
+var card = document.querySelectorAll(arguments[0])[arguments[1]];
+var buttons = card ? card.querySelectorAll("button") : [];
+for (var i = 0; i < buttons.length; i++) {
+    if (buttons[i].textContent.trim() === arguments[2]) {
+        var evt = document.createEvent('MouseEvents');
+        evt.initMouseEvent('click', true, true, window, 0, 0, 0, 0, 0,
+                           false, false, false, false, 0, null);
+        buttons[i].dispatchEvent(evt);
+        return true;
+    }
+}
+return false;
+"""
+
+
+def get_search_result_cards(browser):
+    """ Get the result cards of the loaded search page as dictionaries with
+    `index`, `profile_url`, `username`, `name`, `headline`, `action` (the
+    text of the action button, e.g. 'Connect') and `action_enabled` """
+    cards = browser.execute_script(EXTRACT_SEARCH_RESULT_CARDS_JS,
+                                   SEARCH_RESULT_CARD_CSS) or []
+
+    for card in cards:
+        card["username"] = get_username_from_url(card["profile_url"])
+
+    return cards
+
+
+def get_search_result_counts(browser):
+    """ Get the `total` results and the number of `pages` of the loaded
+    search page, None for a count the page doesn't show """
+    counts = browser.execute_script(EXTRACT_SEARCH_RESULT_COUNTS_JS,
+                                    SEARCH_RESULT_TOTAL_CSS,
+                                    SEARCH_PAGE_BUTTON_CSS) or {}
+
+    return count_search_pages(counts.get("total"), counts.get("last_page"))
+
+
+def count_search_pages(total_text, last_page_text):
+    """ Get the `total` results and the number of `pages` out of the texts
+    of the result count and of the last page button """
+    total = parse_count(total_text)
+    last_page = parse_count(last_page_text)
+
+    if last_page:
+        pages = last_page
+    elif total is not None:
+        pages = ceil(total / SEARCH_RESULTS_PER_PAGE)
+    else:
+        pages = None
+
+    if pages is not None:
+        pages = min(pages, SEARCH_MAX_PAGES)
+
+    return {"total": total, "pages": pages}
+
+
+def parse_count(text):
+    """ Get the number out of a text such as 'Showing 1,234 results' """
+    digits = re.sub(r"[^0-9]", "", text or "")
+    return int(digits) if digits else None
+
+
+def get_sent_invitation_cards(browser):
+    """ Get the cards of the loaded sent invitations page as dictionaries
+    with `index`, `profile_url`, `username` and `time` (since when the
+    invitation is pending, e.g. '2 months ago') """
+    cards = browser.execute_script(EXTRACT_SENT_INVITATION_CARDS_JS,
+                                   SENT_INVITATION_CARD_CSS) or []
+
+    for card in cards:
+        card["username"] = get_username_from_url(card["profile_url"])
+
+    return cards
+
+
+def get_username_from_url(profile_url):
+    """ Get the username out of a profile URL such as
+    `https://www.linkedin.com/in/<username>/` """
+    if not profile_url:
+        return None
+
+    parts = profile_url.split('/')
+    return parts[4] if len(parts) > 4 else None
+
+
+def click_search_result_action(browser, index, label):
+    """ Click the button with the given label on the result card at the
+    given index, returns False if there is no such button """
+    return browser.execute_script(CLICK_SEARCH_RESULT_ACTION_JS,
+                                  SEARCH_RESULT_CARD_CSS, index, label)
@@ -0,0 +1,172 @@
+""" Module which keeps the selectors of the page elements by name, each
+with an ordered chain of fallbacks, and records how they perform """
+import threading
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+from .search_util import SENT_INVITATION_CARD_CSS
+
+SKILLS_SECTION_CSS = ("div.profile-detail > div.pv-deferred-area > div > "
+                      "section.pv-profile-section.pv-skill-categories-section")
+
+# named selectors, each an ordered chain of ("css" | "xpath", selector)
+SELECTORS = {
+    # popups after clicking 'Connect'
+    "connect_popup": [
+        ("css", "div.modal-wormhole-content > div")],
+    "connect_popup_send_button": [
+        ("xpath", "//div[1]/div/section/div/div[2]/button[2]"),
+        ("css", "div.send-invite__actions > button.button-primary-large")],
+    "connect_popup_close_button": [
+        ("xpath", "//div[1]/div/section/div/header/button"),
+        ("css", "button.send-invite__cancel-btn")],
+    "connect_new_popup_buttons": [
+        ("css", "#artdeco-modal-outlet div.artdeco-modal-overlay "
+                "div.artdeco-modal div.artdeco-modal__actionbar "
+                "button.artdeco-button"),
+        ("css", "div.artdeco-modal__actionbar button.artdeco-button")],
+
+    # sent invitations
+    "sent_invitation_card": [
+        ("css", SENT_INVITATION_CARD_CSS)],
+    "sent_invitation_checkbox": [
+        ("css", "div > div:nth-child(1) > input"),
+        ("css", "input[type='checkbox']")],
+    "withdraw_button": [
+        ("css", "ul > li.mn-list-toolbar__right-button > button"),
+        ("xpath", "//button[contains(., 'Withdraw')]")],
+
+    # skills & endorsements of a profile
+    "skills_pane": [
+        ("css", SKILLS_SECTION_CSS),
+        ("css", "section.pv-skill-categories-section")],
+    "first_skill_button_icon": [
+        ("css", SKILLS_SECTION_CSS + " > ol > li > div > div > div > "
+                                     "button > li-icon"),
+        ("css", "section.pv-skill-categories-section ol > li button > "
+                "li-icon")],
+    "first_skill_button": [
+        ("css", SKILLS_SECTION_CSS + " > ol > li > div > div > div > "
+                                     "button"),
+        ("css", "section.pv-skill-categories-section ol > li button")],
+    "first_skill_title": [
+        ("css", SKILLS_SECTION_CSS + " > ol > li > div > div > p > a > "
+                                     "span"),
+        ("css", "section.pv-skill-categories-section ol > li p > a > span")],
+
+    # jobs
+    "job_title_input": [
+        ("xpath", '//input[contains(@id,"jobs-search-box-keyword-id")]')],
+    "job_location_input": [
+        ("xpath", '//input[contains(@id,"jobs-search-box-location-id")]')],
+    "job_search_button": [
+        ("xpath",
+         '//button[contains(@class,"jobs-search-box__submit-button")]')],
+    "job_search_results": [
+        ("css", "div.jobs-search-results")],
+}
+
+SELECTOR_TYPES = {"css": By.CSS_SELECTOR, "xpath": By.XPATH}
+
+# seconds between two tries of the chain while waiting for an element
+POLL_INTERVAL = 0.25
+
+
+class SelectorRegistry:
+    """ Finds the elements by the name of their selector, trying the last
+    winning fallback of the chain first. The browsers of a session have no
+    implicit wait, so a missing element is only waited for up to the
+    `timeout` of the lookup """
+    def __init__(self, selectors=SELECTORS):
+        self.chains = dict(selectors)
+        self.lock = threading.Lock()
+        self.winners = {}
+        self.stats = {}
+
+    def get_order(self, name):
+        """ Get the indexes of the chain with the last winner first """
+        winner = self.winners.get(name, 0)
+        return [winner] + [index for index in range(len(self.chains[name]))
+                           if index != winner]
+
+    def lookup(self, browser, name, within=None, timeout=0):
+        """ Get the elements of the first selector of the chain which finds
+        any, trying the chain again until `timeout` seconds pass """
+        chain = self.chains[name]
+        scope = within if within is not None else browser
+        start_time = time.time()
+
+        while True:
+            for index in self.get_order(name):
+                kind, selector = chain[index]
+                found = scope.find_elements(SELECTOR_TYPES[kind], selector)
+                if found:
+                    self.record(name, index, time.time() - start_time)
+                    return found
+
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+        self.record(name, None, time.time() - start_time)
+        return []
+
+    def find_element(self, browser, name, within=None, timeout=0):
+        """ Find the first element of the named selector, raises
+        `NoSuchElementException` if none of its fallbacks finds one """
+        found = self.lookup(browser, name, within, timeout)
+        if not found:
+            raise NoSuchElementException(
+                "None of the '{}' selectors found an element: {}"
+                .format(name, [selector for kind, selector
+                               in self.chains[name]]))
+
+        return found[0]
+
+    def find_elements(self, browser, name, within=None, timeout=0):
+        """ Find all the elements of the named selector, an empty list if
+        none of its fallbacks finds any """
+        return self.lookup(browser, name, within, timeout)
+
+    def record(self, name, index, latency):
+        with self.lock:
+            stats = self.stats.setdefault(
+                name, {"hits": 0, "misses": 0, "latency": 0.0})
+            stats["latency"] += latency
+
+            if index is None:
+                stats["misses"] += 1
+            else:
+                stats["hits"] += 1
+                self.winners[name] = index
+
+    def get_stats(self):
+        """ Get the hits, misses, average lookup latency (ms) and winning
+        selector of every named selector used so far """
+        with self.lock:
+            return {name: {"hits": stats["hits"],
+                           "misses": stats["misses"],
+                           "latency_ms": round(
+                               stats["latency"] * 1000 /
+                               (stats["hits"] + stats["misses"]), 1),
+                           "winner": self.chains[name][
+                               self.winners.get(name, 0)][1]}
+                    for name, stats in self.stats.items()}
+
+    def report(self, logger):
+        stats = self.get_stats()
+        if not stats:
+            return
+
+        logger.info("Selector Report:\n{}".format("\n".join(
+            "\t|> {}: {} hits, {} misses, {} ms on average  |  {}".format(
+                name, stats[name]["hits"], stats[name]["misses"],
+                stats[name]["latency_ms"], stats[name]["winner"])
+            for name in sorted(stats))))
+
+
+# selectors of the whole session, shared by its parallel workers
+selector_registry = SelectorRegistry()
@@ -46,15 +46,40 @@ class Settings:
     # set current profile credentials for DB operations
     profile = {"id": None, "name": None}
 
+    # keep every profile in its own DB shard rather than a shared DB
+    split_db = False
+
     # hold live Quota Supervisor configuration for global usage
     QS_config = {}
 
+    # write the buffered `recordActivity` counters to the DB once either
+    # this many seconds have passed or this many increments are pending
+    activity_flush_interval = 30
+    activity_flush_threshold = 25
+
     # specify either connected locally or through a proxy
     connection_type = None
 
     # store user-defined delay time to sleep after doing actions
     action_delays = {}
 
+    # seconds to wait for the elements of a page to show up
+    page_delay = 25
+
+    # most steps to scroll a page down while its lazy content keeps loading
+    scroll_max_steps = 9
+
+    # seconds the known page count of a search is trusted before its first
+    # page is read again
+    search_index_ttl = 7 * 24 * 3600
+
+    # seconds the cached result cards of a search page are trusted to skip
+    # the page when none of them is left to connect
+    search_results_ttl = 3 * 24 * 3600
+
+    # the resource blocking `NetworkPolicy` of the session, if any
+    network_policy = None
+
     # store configuration of text analytics
     meaningcloud_config = {}
     yandex_config = {}
@@ -1,12 +1,16 @@
 """ Module which handles the connect features like unconnecting and connecting """
 # from datetime import datetime, timedelta
-# import time
+import time
 import os
 # import random
 import json
 # import csv
-import sqlite3
-# from math import ceil
+# import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from math import ceil
+from math import log
 
 # from socialcommons.time_util import sleep
 # from .util import delete_line_from_file
@@ -26,115 +30,248 @@ import sqlite3
 # from socialcommons.relationship_tools import get_connecters
 # from socialcommons.relationship_tools import get_nonconnecters
 from .database_engine import get_database
+from .database_engine import get_connection
+from .database_engine import write_with_retry
+from .database_engine import upsert_rows
 # from socialcommons.quota_supervisor import quota_supervisor
 # from .util import is_connect_me
 # from .util import get_epoch_time_diff
 from .settings import Settings
 
-def dump_connect_restriction(profile_name, logger, logfolder):
-    """ Dump connect restriction data to a local human-readable JSON """
+# write a new record or count one more time on the existing, stamping the
+# change time (epoch milliseconds) for the incremental export
+UPSERT_CONNECT_RESTRICTION = (
+    "INSERT INTO connectRestriction (profile_id, username, times, modified) "
+    "VALUES (:id, :username, 1, :modified) "
+    "ON CONFLICT (profile_id, username) "
+    "DO UPDATE SET times = times + 1, modified = excluded.modified",
+    "UPDATE connectRestriction SET times = times + 1, modified = :modified "
+    "WHERE profile_id = :id AND username = :username",
+    "INSERT OR IGNORE INTO connectRestriction "
+    "(profile_id, username, times, modified) "
+    "VALUES (:id, :username, 1, :modified)")
 
+
+class BloomFilter:
+    """ Compact set which answers "surely not added" without ever giving a
+    false negative, sized for `capacity` keys at the given error rate """
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key):
+        """ Derive the bit positions of a key by double hashing """
+        digest = hashlib.md5(key.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(key))
+
+
+class ConnectedPool:
+    """ Session-wide copy of `connectRestriction` for a profile: the Bloom
+    filter rejects most unknown users and the exact `username -> times`
+    dictionary answers the rest, so reads never hit the DB """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.owner = None
+        self.times = {}
+        self.bloom = BloomFilter(1024)
+        self.claimed = set()
+
+    def load(self, db, id):
+        """ Read the connected users of the profile from the DB """
+        conn = get_connection(db)
+        cur = conn.execute(
+            "SELECT username, times FROM connectRestriction WHERE "
+            "profile_id=:var", {"var": id})
+        times = {row["username"]: row["times"] for row in cur}
+
+        with self.lock:
+            self.owner = (db, id)
+            self.times = times
+            self.claimed = set()
+            self.rebuild_bloom()
+
+    def rebuild_bloom(self):
+        self.bloom = BloomFilter(max(1024, 2 * len(self.times)))
+        for username in self.times:
+            self.bloom.add(username)
+
+    def get_times(self, db, id, username):
+        """ Get how many times the user has been connected """
+        if self.owner != (db, id):
+            self.load(db, id)
+
+        with self.lock:
+            if username not in self.bloom:
+                return 0
+
+            return self.times.get(username, 0)
+
+    def claim(self, db, id, username):
+        """ Reserve the user for a single connect attempt in the session,
+        returns False if the user has already been claimed """
+        if self.owner != (db, id):
+            self.load(db, id)
+
+        with self.lock:
+            if username in self.claimed:
+                return False
+
+            self.claimed.add(username)
+            return True
+
+    def count(self, db, id, username):
+        """ Count one more connect of the user after it's written to DB """
+        if self.owner != (db, id):
+            self.load(db, id)
+            return
+
+        with self.lock:
+            self.times[username] = self.times.get(username, 0) + 1
+            self.bloom.add(username)
+
+            if len(self.times) > self.bloom.capacity:
+                # keep the false positive rate low as the pool grows
+                self.rebuild_bloom()
+
+
+# connected users of the current profile, shared by the whole session
+connected_pool = ConnectedPool()
+
+
+def load_connected_pool(logger):
+    """ Load the connected users of the current profile into memory """
     try:
-        # get a DB and start a connection
         db, id = get_database(Settings)
-        conn = sqlite3.connect(db)
-
-        with conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-
-            cur.execute(
-                "SELECT * FROM connectRestriction WHERE profile_id=:var",
-                {"var": id})
-            data = cur.fetchall()
-
-        if data:
-            # get the existing data
-            filename = "{}connectRestriction.json".format(logfolder)
-            if os.path.isfile(filename):
-                with open(filename) as connectResFile:
-                    current_data = json.load(connectResFile)
-            else:
-                current_data = {}
+        connected_pool.load(db, id)
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred while loading connect Restriction:\n\t{}"
+            .format(str(exc).encode("utf-8")))
 
-            # pack the new data
-            connect_data = {user_data[1]: user_data[2] for user_data in
-                           data or []}
-            current_data[profile_name] = connect_data
 
-            # dump the fresh connect data to a local human readable JSON
-            with open(filename, 'w') as connectResFile:
-                json.dump(current_data, connectResFile)
+def claim_connect(username):
+    """ Make sure no parallel worker of the session connects the same user
+    at the same time """
+    db, id = get_database(Settings)
+    return connected_pool.claim(db, id, username)
+
+
+def export_connect_restriction(profile_name, logger, logfolder):
+    """ Append the connect restriction rows changed since the last export to
+    a local human-readable JSON-lines file, streaming them from the DB """
+    filename = "{}connectRestriction.jsonl".format(logfolder)
+    watermark_filename = "{}connectRestriction.watermark.json".format(
+        logfolder)
+
+    try:
+        # find where the previous export stopped
+        if os.path.isfile(watermark_filename):
+            with open(watermark_filename) as watermarkFile:
+                watermarks = json.load(watermarkFile)
+        else:
+            watermarks = {}
+        watermark = watermarks.get(profile_name, -1)
+
+        # get a DB and its long-lived connection
+        db, id = get_database(Settings)
+        conn = get_connection(db)
+
+        cur = conn.execute(
+            "SELECT username, times, modified FROM connectRestriction "
+            "WHERE profile_id=:id_var AND modified > :watermark "
+            "ORDER BY modified", {"id_var": id, "watermark": watermark})
+
+        exported = 0
+        with open(filename, 'a') as connectResFile:
+            for row in cur:
+                connectResFile.write(json.dumps(
+                    {"profile": profile_name,
+                     "username": row["username"],
+                     "times": row["times"],
+                     "modified": row["modified"]}) + "\n")
+                watermark = row["modified"]
+                exported += 1
+
+        if exported:
+            watermarks[profile_name] = watermark
+            # replace the watermark at once so it never gets half written
+            with open(watermark_filename + ".tmp", 'w') as watermarkFile:
+                json.dump(watermarks, watermarkFile)
+            os.replace(watermark_filename + ".tmp", watermark_filename)
 
     except Exception as exc:
         logger.error(
-            "Pow! Error occurred while dumping connect restriction data to a "
-            "local JSON:\n\t{}".format(
+            "Pow! Error occurred while exporting connect restriction data to "
+            "a local JSON:\n\t{}".format(
                 str(exc).encode("utf-8")))
 
-    finally:
-        if conn:
-            # close the open connection
-            conn.close()
-
 
 def connect_restriction(operation, username, limit, logger):
     """ Keep track of the connected users and help avoid excessive connect of
     the same user """
 
     try:
-        # get a DB and start a connection
         db, id = get_database(Settings)
-        conn = sqlite3.connect(db)
-
-        with conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-
-            cur.execute(
-                "SELECT * FROM connectRestriction WHERE profile_id=:id_var "
-                "AND username=:name_var",
-                {"id_var": id, "name_var": username})
-            data = cur.fetchone()
-            connect_data = dict(data) if data else None
-
-            if operation == "write":
-                if connect_data is None:
-                    # write a new record
-                    cur.execute(
-                        "INSERT INTO connectRestriction (profile_id, "
-                        "username, times) VALUES (?, ?, ?)",
-                        (id, username, 1))
-                else:
-                    # update the existing record
-                    connect_data["times"] += 1
-                    sql = "UPDATE connectRestriction set times = ? WHERE " \
-                          "profile_id=? AND username = ?"
-                    cur.execute(sql, (connect_data["times"], id, username))
-
-                # commit the latest changes
-                conn.commit()
-
-            elif operation == "read":
-                if connect_data is None:
-                    return False
-
-                elif connect_data["times"] < limit:
-                    return False
-
-                else:
-                    exceed_msg = "" if connect_data[
-                                           "times"] == limit else "more than "
-                    logger.info("---> {} has already been connected {}{} times"
-                                .format(username, exceed_msg, str(limit)))
-                    return True
+
+        if operation == "write":
+            modified = int(time.time() * 1000)
+            write_with_retry(db, lambda conn: upsert_rows(
+                conn, UPSERT_CONNECT_RESTRICTION,
+                [{"id": id, "username": username, "modified": modified}]))
+
+            connected_pool.count(db, id, username)
+
+        elif operation == "read":
+            times = connected_pool.get_times(db, id, username)
+
+            if times < limit:
+                return False
+
+            else:
+                exceed_msg = "" if times == limit else "more than "
+                logger.info("---> {} has already been connected {}{} times"
+                            .format(username, exceed_msg, str(limit)))
+                return True
 
     except Exception as exc:
         logger.error(
             "Dap! Error occurred with connect Restriction:\n\t{}".format(
                 str(exc).encode("utf-8")))
 
-    finally:
-        if conn:
-            # close the open connection
-            conn.close()
+
+def write_connect_restrictions(usernames, logger):
+    """ Count one more connect for each of the users in a single batch
+    write, skipping the duplicates of the batch """
+    usernames = list(OrderedDict.fromkeys(usernames))
+    if not usernames:
+        return
+
+    try:
+        db, id = get_database(Settings)
+        modified = int(time.time() * 1000)
+        write_with_retry(db, lambda conn: upsert_rows(
+            conn, UPSERT_CONNECT_RESTRICTION,
+            [{"id": id, "username": username, "modified": modified}
+             for username in usernames]))
+
+        for username in usernames:
+            connected_pool.count(db, id, username)
+
+    except Exception as exc:
+        logger.error(
+            "Dap! Error occurred with connect Restriction:\n\t{}".format(
+                str(exc).encode("utf-8")))
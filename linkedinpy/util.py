@@ -1,14 +1,17 @@
 """ Common utilities """
-# import time
+import time
+import calendar
 # import datetime
 from math import ceil
 # from math import radians
 # from math import degrees as rad2deg
 # from math import cos
-# import random
+import random
 import re
 # import regex
 import signal
+import threading
+import weakref
 # import os
 # import sys
 # from sys import exit as clean_exit
@@ -16,21 +19,26 @@ import signal
 from platform import python_version
 # from subprocess import call
 # import csv
-import sqlite3
+# import sqlite3
 # import json
 from contextlib import contextmanager
 # from tempfile import gettempdir
 # import emoji
 # from emoji.unicode_codes import UNICODE_EMOJI
 from argparse import ArgumentParser
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
 
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.common.by import By
 
-from socialcommons.time_util import sleep
+# from socialcommons.time_util import sleep
 from socialcommons.time_util import sleep_actual
 from .database_engine import get_database
+from .database_engine import write_with_retry
 from socialcommons.quota_supervisor import quota_supervisor
 from .settings import Settings
 # from .settings import Selectors
@@ -39,6 +47,24 @@ from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import WebDriverException
 from selenium.common.exceptions import TimeoutException
 
+# `recordActivity` counters waiting to be written by `flush_activity`
+activity_buffer = {"records": {}, "pending": 0, "flushed_at": time.time()}
+activity_lock = threading.Lock()
+
+# the page each browser is known to be on, as the normalized URLs it was
+# navigated to and landed on, until a click may have taken it elsewhere
+navigation_state = weakref.WeakKeyDictionary()
+
+# a GET timing out is retried with a backoff doubling from
+# `NAVIGATION_RETRY_DELAY` seconds up to `NAVIGATION_RETRY_MAX_DELAY`
+NAVIGATION_RETRIES = 7
+NAVIGATION_RETRY_DELAY = 1
+NAVIGATION_RETRY_MAX_DELAY = 30
+
+# the cookie fields which `add_cookie` accepts on every driver
+COOKIE_FIELDS = ["name", "value", "path", "domain", "secure", "httpOnly",
+                 "expiry"]
+
 # def is_private_profile(browser, logger, connecting=True):
 #     is_private = None
 #     try:
@@ -371,57 +397,102 @@ def getUserData(Settings, query,
 
 def update_activity(Settings, action="server_calls"):
     """ Record every Instagram server call (page load, content load, likes,
-        comments, connects, unconnect). """
+        comments, connects, unconnect).
+
+    The counters are buffered in memory and written to the DB by
+    `flush_activity` once a time or count threshold is reached. """
     # check action availability
     quota_supervisor(Settings, "server_calls")
 
-    # get a DB and start a connection
+    # get a DB and the current hour to account the activity at
     db, id = get_database(Settings)
-    conn = sqlite3.connect(db)
+    hour = get_hour_bucket()
 
-    with conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        # collect today data
-        cur.execute("SELECT * FROM recordActivity WHERE profile_id=:var AND "
-                    "STRFTIME('%Y-%m-%d %H', created) == STRFTIME('%Y-%m-%d "
-                    "%H', 'now', 'localtime')",
-                    {"var": id})
-        data = cur.fetchone()
-
-        if data is None:
-            # create a new record for the new day
-            cur.execute("INSERT INTO recordActivity VALUES "
-                        "(?, 0, 1, STRFTIME('%Y-%m-%d %H:%M:%S', "
-                        "'now', 'localtime'))",
-                        (id,))
+    if action != "server_calls":
+        quota_supervisor(Settings, action, update=True)
+    # always update server calls
+    quota_supervisor(Settings, "server_calls", update=True)
 
-        else:
-            # sqlite3.Row' object does not support item assignment -> so,
-            # convert it into a new dict
-            data = dict(data)
+    with activity_lock:
+        record = activity_buffer["records"].setdefault(
+            (db, id, hour), {"connections": 0, "server_calls": 0})
 
-            # update
-            data[action] += 1
-            quota_supervisor(Settings, action, update=True)
+        if action != "server_calls":
+            record["connections"] += 1
+        record["server_calls"] += 1
+        record["created"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        activity_buffer["pending"] += 1
 
-            if action != "server_calls":
-                # always update server calls
-                data["server_calls"] += 1
-                quota_supervisor(Settings, "server_calls", update=True)
+        flush_due = (activity_buffer["pending"] >=
+                     Settings.activity_flush_threshold or
+                     time.time() - activity_buffer["flushed_at"] >=
+                     Settings.activity_flush_interval)
 
-            sql = ("UPDATE recordActivity set "
-                   "connections = ?, server_calls = ?, "
-                   "created = STRFTIME('%Y-%m-%d %H:%M:%S', 'now', "
-                   "'localtime') "
-                   "WHERE  profile_id=? AND STRFTIME('%Y-%m-%d %H', created) "
-                   "== "
-                   "STRFTIME('%Y-%m-%d %H', 'now', 'localtime')")
+    if flush_due:
+        flush_activity(Settings)
 
-            cur.execute(sql, (data['connections'], data['server_calls'], id))
 
-        # commit the latest changes
-        conn.commit()
+def get_hour_bucket():
+    """ Get the current local hour as hours since the epoch, the same value
+    the `hour_bucket` column of `recordActivity` holds """
+    return calendar.timegm(time.localtime()) // 3600
+
+
+def flush_activity(Settings):
+    """ Write the buffered activity counters to `recordActivity` in a single
+    transaction per DB """
+    with activity_lock:
+        records = activity_buffer["records"]
+        activity_buffer["records"] = {}
+        activity_buffer["pending"] = 0
+        activity_buffer["flushed_at"] = time.time()
+
+    databases = {}
+    for (db, id, hour), record in records.items():
+        databases.setdefault(db, []).append((id, hour, record))
+
+    def write_records(conn, db_records):
+        cur = conn.cursor()
+
+        for id, hour, record in db_records:
+            sql = ("UPDATE recordActivity set "
+                   "connections = connections + ?, "
+                   "server_calls = server_calls + ?, created = ? "
+                   "WHERE profile_id=? AND hour_bucket=?")
+            cur.execute(sql, (record["connections"],
+                              record["server_calls"],
+                              record["created"], id, hour))
+
+            if cur.rowcount == 0:
+                # create a new record for the new hour
+                cur.execute("INSERT INTO recordActivity (profile_id, "
+                            "connections, server_calls, created, "
+                            "hour_bucket) VALUES (?, ?, ?, ?, ?)",
+                            (id, record["connections"],
+                             record["server_calls"],
+                             record["created"], hour))
+
+    for db, db_records in databases.items():
+        try:
+            write_with_retry(
+                db, lambda conn: write_records(conn, db_records))
+
+        except Exception as exc:
+            # keep the counters to write them with the next flush
+            with activity_lock:
+                for id, hour, record in db_records:
+                    buffered = activity_buffer["records"].setdefault(
+                        (db, id, hour), {"connections": 0, "server_calls": 0})
+                    buffered["connections"] += record["connections"]
+                    buffered["server_calls"] += record["server_calls"]
+                    buffered.setdefault("created", record["created"])
+                    activity_buffer["pending"] += record["server_calls"]
+
+            if Settings.logger:
+                Settings.logger.warning(
+                    "Uh! Error occurred while saving activity records:\n\t{}"
+                    .format(str(exc).encode("utf-8")))
+
 
 # def add_user_to_blacklist(username, campaign, action, logger, logfolder):
 #     file_exists = os.path.isfile('{}blacklist.csv'.format(logfolder))
@@ -803,6 +874,8 @@ def click_element(browser, element, tryNum=0):
       various ways. if all else fails, programmically click the button
       using `execute_script` in the browser.
       """
+    # the click may navigate to another page
+    forget_navigation(browser)
 
     try:
         # use Selenium's built in click function
@@ -908,45 +981,120 @@ def format_number(number):
 def get_relationship_counts(browser, username, logger):
     return 12000,12000
 
+# scroll one screen further and report the lazy loading progress
+SCROLL_STEP_JS = """
+window.scrollBy(0, window.innerHeight);
+return [document.querySelectorAll(arguments[0]).length,
+        document.body.scrollHeight,
+        window.pageYOffset + window.innerHeight >=
+            document.body.scrollHeight - 2];
+"""
+
+
+def scroll_until_loaded(browser, item_css, max_steps=None, step_delay=0.5):
+    """ Scroll down the page a screen at a time to get its lazy content
+    loaded, stopping at the bottom once neither the number of items matching
+    the CSS selector nor the page height changed since the previous step """
+    max_steps = max_steps or Settings.scroll_max_steps
+    last_progress = None
+
+    for step in range(max_steps):
+        items, height, at_bottom = browser.execute_script(SCROLL_STEP_JS,
+                                                          item_css)
+        if at_bottom and (items, height) == last_progress:
+            break
+
+        last_progress = (items, height)
+        sleep_actual(step_delay)
+
+
 def web_address_navigator(Settings, browser, link):
     """Checks and compares current URL of web page and the URL to be
     navigated and if it is different, it does navigate"""
-    current_url = get_current_url(browser)
+    target = normalize_url(link)
+
+    # compare with the tracked page, asking the browser only if it's unknown
+    known_urls = navigation_state.get(browser)
+    if known_urls is None:
+        current_url = get_current_url(browser)
+        known_urls = ([normalize_url(current_url)]
+                      if current_url is not None else [])
+
+    if target in known_urls:
+        return
+
     total_timeouts = 0
-    page_type = None  # file or directory
-
-    # remove slashes at the end to compare efficiently
-    if current_url is not None and current_url.endswith('/'):
-        current_url = current_url[:-1]
-
-    if link.endswith('/'):
-        link = link[:-1]
-        page_type = "dir"  # slash at the end is a directory
-
-    new_navigation = (current_url != link)
-
-    if current_url is None or new_navigation:
-        link = link + '/' if page_type == "dir" else link  # directory links
-        # navigate faster
-
-        while True:
-            try:
-                browser.get(link)
-                # update server calls
-                update_activity(Settings)
-                sleep(2)
-                break
-
-            except TimeoutException as exc:
-                if total_timeouts >= 7:
-                    raise TimeoutException(
-                        "Retried {} times to GET '{}' webpage "
-                        "but failed out of a timeout!\n\t{}".format(
-                            total_timeouts,
-                            str(link).encode("utf-8"),
-                            str(exc).encode("utf-8")))
-                total_timeouts += 1
-                sleep(2)
+    while True:
+        try:
+            browser.get(link)
+            # update server calls
+            update_activity(Settings)
+            # wait until the page is loaded rather than a fixed time
+            explicit_wait(browser, "PFL", [], Settings.logger, 10,
+                          notify=False)
+            if Settings.network_policy:
+                Settings.network_policy.count_blocked(browser)
+            break
+
+        except TimeoutException as exc:
+            forget_navigation(browser)
+            if total_timeouts >= NAVIGATION_RETRIES:
+                raise TimeoutException(
+                    "Retried {} times to GET '{}' webpage "
+                    "but failed out of a timeout!\n\t{}".format(
+                        total_timeouts,
+                        str(link).encode("utf-8"),
+                        str(exc).encode("utf-8")))
+
+            # capped exponential backoff, half of it jittered
+            delay = min(NAVIGATION_RETRY_MAX_DELAY,
+                        NAVIGATION_RETRY_DELAY * 2 ** total_timeouts)
+            total_timeouts += 1
+            sleep_actual(delay / 2 + random.uniform(0, delay / 2))
+
+    # remember redirects too, e.g. `/in/<username>` to its canonical URL
+    track_navigation(browser, link, get_current_url(browser))
+
+
+def normalize_url(url):
+    """ Normalize a URL for comparison: lowercase scheme and host, no
+    trailing slash nor fragment, and sorted query parameters """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path.rstrip('/'), query, ''))
+
+
+def track_navigation(browser, link, landed_url=None):
+    """ Remember the page the browser got to, by the URL it was navigated
+    to and the one it landed on """
+    navigation_state[browser] = [normalize_url(url)
+                                 for url in (link, landed_url) if url]
+
+
+def forget_navigation(browser):
+    """ Forget the page of the browser, e.g. after a click which may have
+    navigated elsewhere, so its URL is asked again next time """
+    navigation_state.pop(browser, None)
+
+
+def add_cookies(browser, cookies):
+    """ Add the given cookies to the browser, skipping the expired ones, and
+    return how many were added. The browser must be on a page of their
+    domain """
+    now = time.time()
+    added = 0
+
+    for cookie in cookies:
+        if cookie.get("expiry") and cookie["expiry"] < now:
+            continue
+
+        browser.add_cookie({key: value for key, value in cookie.items()
+                            if key in COOKIE_FIELDS})
+        added += 1
+
+    return added
 
 
 @contextmanager
@@ -1408,17 +1556,33 @@ def explicit_wait(browser, track, ec_params, logger, timeout=35, notify=True):
         locator = (find_by, elem_address)
         condition = ec.visibility_of_element_located(locator)
 
+    elif track == "PEL":
+        elem_address, find_method = ec_params
+        ec_name = "presence of element located"
+
+        find_by = (By.XPATH if find_method == "XPath" else
+                   By.CSS_SELECTOR if find_method == "CSS" else
+                   By.CLASS_NAME)
+        locator = (find_by, elem_address)
+        condition = ec.presence_of_element_located(locator)
+
     elif track == "TC":
         expect_in_title = ec_params[0]
         ec_name = "title contains '{}' string".format(expect_in_title)
 
         condition = ec.title_contains(expect_in_title)
 
+    elif track == "UC":
+        previous_url = ec_params[0]
+        ec_name = "URL changes from '{}'".format(previous_url)
+
+        condition = ec.url_changes(previous_url)
+
     elif track == "PFL":
         ec_name = "page fully loaded"
         condition = (lambda browser: browser.execute_script(
             "return document.readyState")
-                                     in ["complete" or "loaded"])
+                                     in ["complete", "loaded"])
 
     elif track == "SO":
         ec_name = "staleness of"
@@ -1757,6 +1921,15 @@ def truncate_float(number, precision, round=False):
     return short_float
 
 
+def format_run_time(seconds):
+    """ Format a run time in seconds, minutes or hours, whichever reads best """
+    return ("{} seconds".format(seconds) if
+            seconds < 60 else
+            "{} minutes".format(truncate_float(seconds / 60, 2)) if
+            seconds < 3600 else
+            "{} hours".format(truncate_float(seconds / 60 / 60, 2)))
+
+
 # def get_time_until_next_month():
 #     """ Get total seconds remaining until the next month """
 #     now = datetime.datetime.now()
@@ -1806,16 +1979,12 @@ def save_account_progress(Settings, browser, username, logger):
     try:
         # DB instance
         db, id = get_database(Settings)
-        conn = sqlite3.connect(db)
-        with conn:
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            sql = ("INSERT INTO accountsProgress (profile_id, connecters, "
-                   "connecting, total_posts, created, modified) "
-                   "VALUES (?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S'), "
-                   "strftime('%Y-%m-%d %H:%M:%S'))")
-            cur.execute(sql, (id, connecters, connecting, posts))
-            conn.commit()
+        sql = ("INSERT INTO accountsProgress (profile_id, connecters, "
+               "connecting, total_posts, created, modified) "
+               "VALUES (?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%S'), "
+               "strftime('%Y-%m-%d %H:%M:%S'))")
+        write_with_retry(db, lambda conn: conn.execute(
+            sql, (id, connecters, connecting, posts)))
     except Exception:
         logger.exception('message')
 
@@ -1978,7 +2147,15 @@ def parse_cli_args():
         "-bwm", "--bypass-with-mobile", help="Bypass with mobile phone",
         action="store_true", default=None)
     parser.add_argument(
-        "-sdb", "--split-db", help="Split sqlite-db as instapy_{username}.db",
+        "-sdb", "--split-db", help="Split sqlite-db as linkedinpy_{username}.db",
+        action="store_true", default=None)
+    parser.add_argument(
+        "-br", "--block-resources",
+        help="Block images, media, fonts and trackers (Chrome only)",
+        action="store_true", default=None)
+    parser.add_argument(
+        "-op", "--offline-parsing",
+        help="Read the cards of a page from its page source",
         action="store_true", default=None)
 
     """ Style below can convert strings into booleans:
@@ -0,0 +1,60 @@
+""" Tests of ending an awaitable session on its own thread """
+import asyncio
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from linkedinpy import linkedinpy
+from linkedinpy.async_linkedinpy import AsyncLinkedinPy
+
+
+def make_session(logfolder):
+    """ Get a LinkedinPy session with no browser nor DB behind it """
+    session = object.__new__(linkedinpy.LinkedinPy)
+    session.browser = mock.Mock()
+    session.logger = mock.Mock()
+    session.username = "stub"
+    session.logfolder = logfolder
+    session.nogui = True
+    session.display = mock.Mock()
+    session.connected = 3
+    session.network_policy = None
+    session.live_report = mock.Mock()
+
+    return session
+
+
+class EndTest(unittest.TestCase):
+    def test_end_off_the_main_thread(self):
+        logfolder = tempfile.mkdtemp() + "/"
+        session = make_session(logfolder)
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        with mock.patch.object(linkedinpy, "close_browser") as close_browser, \
+                mock.patch.object(linkedinpy, "export_connect_restriction") \
+                as export, \
+                mock.patch.object(linkedinpy, "flush_activity") as flush, \
+                mock.patch.object(linkedinpy, "close_connections") as close, \
+                mock.patch.object(linkedinpy, "highlight_print"):
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(
+                    AsyncLinkedinPy(session, executor).end())
+            finally:
+                loop.close()
+
+        close_browser.assert_called_once_with(session.browser, False,
+                                              session.logger)
+        session.display.stop.assert_called_once_with()
+        export.assert_called_once_with("stub", session.logger, logfolder)
+        flush.assert_called_once_with(linkedinpy.Settings)
+        close.assert_called_once_with()
+        session.live_report.assert_called_once_with()
+
+        with open(logfolder + "connected.txt") as connectFile:
+            self.assertEqual(connectFile.read(), "3")
+
+
+if __name__ == "__main__":
+    unittest.main()
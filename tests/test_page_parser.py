@@ -0,0 +1,93 @@
+""" Tests of the offline page parser against a saved search page """
+import os
+import unittest
+
+from linkedinpy.page_parser import parse_html
+from linkedinpy.page_parser import parse_search_result_cards
+from linkedinpy.page_parser import parse_search_result_counts
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures",
+                       "search_results.html")
+
+
+class SelectorTest(unittest.TestCase):
+    def setUp(self):
+        with open(FIXTURE, encoding="utf-8") as pageFile:
+            self.document = parse_html(pageFile.read())
+
+    def texts(self, selector):
+        return [node.text for node in self.document.select(selector)]
+
+    def test_descendant(self):
+        self.assertEqual(self.texts("li.search-result p.subline-level-1"),
+                         ["Founder at Acme", "CTO at Initech"])
+        # the ad isn't a search result, though it has a wrapper
+        self.assertEqual(len(self.document.select(
+            "li.search-result div.search-result__wrapper")), 2)
+        self.assertEqual(len(self.document.select(
+            "div.search-result__wrapper")), 3)
+
+    def test_child(self):
+        self.assertEqual(self.texts("h3 > span > span > span"),
+                         ["Jane & Doe", "John Roe"])
+        self.assertEqual(self.document.select("li.search-result > button"), [])
+        self.assertEqual(len(self.document.select(
+            "ul.search-results__list > li > div.search-entity")), 2)
+
+    def test_nth_child(self):
+        self.assertEqual(self.texts(
+            "ul.artdeco-pagination__pages > li:nth-child(2) span"), ["2"])
+        self.assertEqual(self.texts("ul.search-results__list > "
+                                    "li:nth-child(3) > div"),
+                         ["Not a result card"])
+        self.assertEqual(self.document.select(
+            "ul.search-results__list > li:nth-child(4)"), [])
+
+    def test_attribute(self):
+        self.assertEqual(self.texts("button[disabled]"), ["Pending"])
+        self.assertEqual(len(self.document.select(
+            "a[data-control-name=search_srp_result]")), 1)
+        self.assertEqual(len(self.document.select("a[href]")), 4)
+        self.assertEqual(self.document.select(
+            "a[data-control-name='nothing']"), [])
+
+    def test_selector_group(self):
+        self.assertEqual(self.texts("h3.search-results__total, "
+                                    "button[disabled]"),
+                         ["Showing 1,234 results", "Pending"])
+
+    def test_script_is_not_markup(self):
+        self.assertEqual(len(self.document.select("li.search-result")), 2)
+
+
+class SearchPageTest(unittest.TestCase):
+    def setUp(self):
+        with open(FIXTURE, encoding="utf-8") as pageFile:
+            self.html = pageFile.read()
+
+    def test_cards(self):
+        cards = parse_search_result_cards(self.html)
+
+        self.assertEqual([card["username"] for card in cards],
+                         ["jane-doe-123", "john-roe"])
+        self.assertEqual(cards[0]["profile_url"],
+                         "https://www.linkedin.com/in/jane-doe-123/")
+        self.assertEqual(cards[0]["name"], "Jane & Doe")
+        self.assertEqual(cards[1]["headline"], "CTO at Initech")
+        self.assertEqual([(card["action"], card["action_enabled"])
+                          for card in cards],
+                         [("Connect", True), ("Pending", False)])
+
+    def test_counts(self):
+        self.assertEqual(parse_search_result_counts(self.html),
+                         {"total": 1234, "pages": 100})
+
+    def test_many_siblings(self):
+        html = "<ul>{}</ul>".format("<li><b>x</b></li>" * 20000)
+        items = parse_html(html).select("ul > li:nth-child(20000) > b")
+
+        self.assertEqual([item.text for item in items], ["x"])
+
+
+if __name__ == "__main__":
+    unittest.main()